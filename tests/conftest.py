@@ -99,4 +99,6 @@ def game(monkeypatch: pytest.MonkeyPatch) -> Game:
     game = Game()
     game.setup(terrain=Terrain(water=[Vec2(210, 210)]))
     game.grid.buildings = {}
+    # One simulation tick per on_update(1 / 60), so that tests can step the game
+    game.ticks_per_second = 60
     return game
@@ -14,6 +14,7 @@ from trainfinity2.terrain import Terrain
 def init(game: Game):
     events: list[Event] = []
     game.setup(Terrain(water=[Vec2(0, 0)]))
+    game.measure_route_searches = True
     events.extend(
         (
             game.grid.create_building(IronMine(Vec2(2, 2))),
@@ -0,0 +1,105 @@
+import random
+from itertools import combinations
+
+import pytest
+from pyglet.math import Vec2
+
+from trainfinity2.collisions import find_colliding_trains
+from trainfinity2.grid import Grid
+from trainfinity2.model import Rail, Station
+from trainfinity2.signal_controller import SignalController
+from trainfinity2.terrain import Terrain
+from trainfinity2.train import Train
+
+
+@pytest.fixture
+def create_train():
+    signal_controller = SignalController()
+    grid = Grid(Terrain(water=[Vec2(10, 10)]), signal_controller)
+    grid.create_station(Station((Vec2(0, 0),)))
+    grid.create_station(Station((Vec2(1, 0),)))
+    grid.create_rail({Rail(0, 0, 1, 0)})
+
+    def inner(
+        x: float,
+        y: float,
+        previous_x: float | None = None,
+        previous_y: float | None = None,
+    ) -> Train:
+        train = Train(Vec2(0, 0), Vec2(1, 0), grid, signal_controller)
+        train.x = x
+        train.y = y
+        train.previous_x = x if previous_x is None else previous_x
+        train.previous_y = y if previous_y is None else previous_y
+        return train
+
+    return inner
+
+
+class TestIsCollidingWith:
+    def test_trains_close_to_each_other_collide(self, create_train):
+        assert create_train(1.0, 1.0).is_colliding_with(create_train(1.2, 0.8))
+
+    def test_trains_far_from_each_other_do_not_collide(self, create_train):
+        assert not create_train(1.0, 1.0).is_colliding_with(create_train(1.3, 1.0))
+
+    def test_trains_passing_through_each_other_collide(self, create_train):
+        train1 = create_train(2.0, 0.0, previous_x=0.0)
+        train2 = create_train(0.0, 0.0, previous_x=2.0)
+
+        assert train1.is_colliding_with(train2)
+
+    def test_trains_crossing_paths_at_the_same_time_collide(self, create_train):
+        train1 = create_train(2.0, 1.0, previous_x=0.0)
+        train2 = create_train(1.0, 2.0, previous_y=0.0)
+
+        assert train1.is_colliding_with(train2)
+
+    def test_trains_crossing_paths_at_different_times_do_not_collide(
+        self, create_train
+    ):
+        train1 = create_train(2.0, 1.0, previous_x=0.0)
+        train2 = create_train(1.0, 1.0, previous_y=-1.0)
+
+        assert not train1.is_colliding_with(train2)
+
+
+class TestFindCollidingTrains:
+    def test_trains_in_neighbouring_cells_collide(self, create_train):
+        train1 = create_train(0.9, 1.95)
+        train2 = create_train(1.05, 2.1)
+        train3 = create_train(3.0, 2.0)
+
+        assert find_colliding_trains([train1, train2, train3]) == [(train1, train2)]
+
+    def test_trains_in_negative_cells_collide(self, create_train):
+        train1 = create_train(-0.1, -0.1)
+        train2 = create_train(0.1, 0.1)
+
+        assert find_colliding_trains([train1, train2]) == [(train1, train2)]
+
+    def test_trains_passing_through_each_other_between_ticks_collide(
+        self, create_train
+    ):
+        train1 = create_train(5.0, 0.0, previous_x=0.0)
+        train2 = create_train(0.0, 0.0, previous_x=5.0)
+
+        assert find_colliding_trains([train1, train2]) == [(train1, train2)]
+
+    def test_same_pairs_as_comparing_all_pairs(self, create_train):
+        random.seed(0)
+        trains = [
+            create_train(
+                x := random.uniform(0, 10),
+                y := random.uniform(0, 10),
+                x + random.uniform(-1, 1),
+                y + random.uniform(-1, 1),
+            )
+            for _ in range(300)
+        ]
+
+        assert find_colliding_trains(trains) == [
+            (train1, train2)
+            for train1, train2 in combinations(trains, 2)
+            if train1.is_colliding_with(train2)
+        ]
@@ -0,0 +1,66 @@
+from pyglet.math import Vec2
+
+from trainfinity2.entities import NO_ENTITY_ID, EntityRegistry
+from trainfinity2.model import IronMine, Rail, Station
+
+
+class TestEntityRegistry:
+    def test_added_entities_are_found_by_id(self):
+        registry = EntityRegistry()
+        rail = Rail(0, 0, 1, 0)
+        mine = IronMine(Vec2(0, 1))
+
+        rail_id = registry.add(rail)
+        mine_id = registry.add(mine)
+
+        assert rail.entity_id == rail_id != NO_ENTITY_ID
+        assert mine.entity_id == mine_id != rail_id
+        assert registry.get(rail_id) is rail
+        assert registry.get(mine_id) is mine
+        assert len(registry) == 2
+
+    def test_removed_entity_is_not_found(self):
+        registry = EntityRegistry()
+        station = Station((Vec2(0, 0),))
+        registry.add(station)
+
+        registry.remove(station)
+
+        assert registry.get(station.entity_id) is None
+        assert len(registry) == 0
+
+    def test_id_of_removed_entity_does_not_refer_to_entity_reusing_its_slot(self):
+        registry = EntityRegistry()
+        rail1 = Rail(0, 0, 1, 0)
+        rail2 = Rail(1, 0, 2, 0)
+        registry.add(rail1)
+        registry.remove(rail1)
+
+        registry.add(rail2)
+
+        assert rail2.entity_id != rail1.entity_id
+        assert registry.get(rail1.entity_id) is None
+        assert registry.get(rail2.entity_id) is rail2
+
+    def test_removing_twice_does_not_remove_other_entity(self):
+        registry = EntityRegistry()
+        rail1 = Rail(0, 0, 1, 0)
+        rail2 = Rail(1, 0, 2, 0)
+        registry.add(rail1)
+        registry.remove(rail1)
+        registry.add(rail2)
+
+        registry.remove(rail1)
+
+        assert registry.get(rail2.entity_id) is rail2
+
+    def test_unknown_id_is_not_found(self):
+        assert EntityRegistry().get(12345) is None
+        assert EntityRegistry().get(NO_ENTITY_ID) is None
+
+    def test_entity_id_does_not_affect_equality(self):
+        rail = Rail(0, 0, 1, 0)
+        EntityRegistry().add(rail)
+
+        assert rail == Rail(0, 0, 1, 0)
+        assert hash(rail) == hash(Rail(0, 0, 1, 0))
@@ -0,0 +1,123 @@
+from pyglet.math import Vec2
+from pytest import approx
+
+from trainfinity2.event_driven_movement import distance_travelled, time_to_travel
+from trainfinity2.game import Game
+from trainfinity2.model import CargoType
+from trainfinity2.train import Train
+from tests.util import create_objects
+
+
+class TestTimeToTravel:
+    def test_accelerating_from_standstill(self):
+        assert time_to_travel(2.0, 0.0, 1.0, 10.0) == approx(2.0)
+
+    def test_at_max_speed(self):
+        assert time_to_travel(2.0, 4.0, 1.0, 4.0) == approx(0.5)
+
+    def test_reaching_max_speed_on_the_way(self):
+        # 0.5 cells in 1 second to reach max speed, then 0.5 cells at max speed
+        assert time_to_travel(1.0, 0.0, 1.0, 1.0) == approx(1.5)
+
+    def test_is_inverse_of_distance_travelled(self):
+        for distance in [0.1, 1.0, 1.5, 10.0]:
+            time = time_to_travel(distance, 0.5, Train.ACCELERATION, Train.MAX_SPEED)
+            assert distance_travelled(
+                time, 0.5, Train.ACCELERATION, Train.MAX_SPEED
+            ) == approx(distance)
+
+
+class TestEventDrivenMovement:
+    def test_train_delivers_iron(self, game: Game):
+        create_objects(
+            game.grid,
+            """
+            . M . F .
+
+            .-S-.-S-.
+            """,
+        )
+        game.use_event_driven_movement()
+        train = game._create_train(*game.grid.station_from_position.values())
+        factory = game.grid.buildings[Vec2(3, 1)]
+        game.simulation.try_create_cargo_in_all_buildings()
+
+        for _ in range(3000):
+            game.on_update(1 / 60)
+            if factory.cargo_count[CargoType.IRON]:
+                break
+
+        assert factory.cargo_count[CargoType.IRON] == 1
+        assert not train.wagons[0].cargo_count[CargoType.IRON]
+
+    def test_train_logic_only_runs_when_reaching_positions(
+        self, game: Game, monkeypatch
+    ):
+        create_objects(
+            game.grid,
+            """
+            . M . . . . . F .
+
+            .-S-.-.-.-.-.-S-.
+            """,
+        )
+        game.use_event_driven_movement()
+        train = game._create_train(*game.grid.station_from_position.values())
+        reached_positions: list[Vec2] = []
+        on_reached_target = Train._on_reached_target
+
+        def recording_on_reached_target(self: Train):
+            reached_positions.append(Vec2(self.x, self.y))
+            return on_reached_target(self)
+
+        monkeypatch.setattr(Train, "_on_reached_target", recording_on_reached_target)
+
+        for _ in range(120):
+            game.on_update(1 / 60)
+
+        assert 2 < train.x < 6
+        # Once for stopping at the first station and once for leaving it
+        assert reached_positions == [
+            Vec2(1, 0),
+            *(Vec2(x, 0) for x in range(1, int(train.x) + 1)),
+        ]
+
+    def test_positions_are_updated_between_positions(self, game: Game):
+        create_objects(
+            game.grid,
+            """
+            . M . . . F .
+
+            .-S-.-.-.-S-.
+            """,
+        )
+        game.use_event_driven_movement()
+        train = game._create_train(*game.grid.station_from_position.values())
+        game.on_update(1 / 60)
+        game.on_update(1 / 60)
+        x = train.x
+
+        game.on_update(1 / 60)
+
+        assert 1 < x < train.x < 2
+        assert train.speed > 0
+
+    def test_colliding_trains_are_destroyed(self, game: Game):
+        create_objects(
+            game.grid,
+            """
+            . M . F .
+
+            .-S-.-S-.
+            """,
+        )
+        game.use_event_driven_movement()
+        stations = game.grid.station_from_position.values()
+        game._create_train(*stations)
+        game._create_train(*stations)
+
+        game.on_update(1 / 60)
+
+        assert game.trains == []
+        assert game.simulation.event_driven_movement is not None
+        game.on_update(1 / 60)
@@ -3,11 +3,14 @@ import arcade
 import pytest
 from pyglet.math import Vec2
 from pytest import approx
+from trainfinity2 import signal_controller
 from trainfinity2.constants import (
     GRID_WIDTH_CELLS,
+    MAX_SIMULATION_TICKS_PER_FRAME,
     SECONDS_BETWEEN_CARGO_CREATION,
 )
 from trainfinity2.game import Mode, Game
+from trainfinity2.route_finder import RouteFinderStats, collect_route_finder_stats
 from trainfinity2.model import (
     IronMine,
     Rail,
@@ -17,6 +20,8 @@ from trainfinity2.model import (
     SteelWorks,
     Water,
 )
+from trainfinity2.terrain import Terrain
+from trainfinity2.train import Train
 from tests.util import create_objects
 
 check_call_count = 0
@@ -166,7 +171,7 @@ class TestBuildingRail:
                 x=130, y=100, button=arcade.MOUSE_BUTTON_LEFT, modifiers=0
             )
 
-        assert len(game.drawer._rail_shapes_from_object_id) == 1
+        assert len(game.drawer._rail_shapes_from_entity_id) == 1
 
     def test_cannot_build_rail_in_illegal_position(self, game: Game):
         game.grid.water = {Vec2(3, 3): Water(Vec2(3, 3))}
@@ -536,6 +541,11 @@ class TestCreateTrain:
         two_trains.on_update(1 / 60)
         assert len(two_trains.trains) == 0
 
+    def test_three_trains_colliding_are_destroyed(self, two_trains: Game):
+        two_trains._create_train(*two_trains.grid.station_from_position.values())
+        two_trains.on_update(1 / 60)
+        assert len(two_trains.trains) == 0
+
     # def test_destroying_the_rails_under_train_destroys_train(self, game: Game):
     #     create_objects(
     #         game.grid,
@@ -567,6 +577,44 @@ class TestCreateTrain:
         game.grid.remove_rail(Vec2(60, 0))
         game.on_update(1 / 60)
 
+    def test_train_route_is_indexed_by_rail(self, game: Game):
+        create_objects(
+            game.grid,
+            """
+            . M . F .
+
+            .-S-.-S-.
+            """,
+        )
+        train = game._create_train(*game.grid.station_from_position.values())
+        while check(train.speed == 0.0):
+            game.on_update(1 / 60)
+
+        assert game.grid.route_users({Rail(2, 0, 3, 0)}) == [train]
+
+        game.simulation.destroy_train(train)
+
+        assert game.grid.route_users({Rail(2, 0, 3, 0)}) == []
+
+    def test_destroying_rail_on_train_route_replans_train(self, game: Game):
+        create_objects(
+            game.grid,
+            """
+            . M . F .
+
+            .-S-.-S-.
+            """,
+        )
+        train = game._create_train(*game.grid.station_from_position.values())
+        while check(train.speed == 0.0):
+            game.on_update(1 / 60)
+        assert train.rails_on_route == [Rail(1, 0, 2, 0), Rail(2, 0, 3, 0)]
+
+        game.grid.remove_rail(Vec2(3, 0))
+
+        assert train.rails_on_route is None
+        assert game.grid.route_users({Rail(1, 0, 2, 0)}) == []
+
     def test_cannot_create_train_in_reserved_signal_block(self, game: Game):
         create_objects(
             game.grid,
@@ -669,7 +717,7 @@ def test_iron_is_regularly_added_to_mines(game: Game):
         """,
     )
     # Start just before creating a new iron
-    game.cargo_counter = SECONDS_BETWEEN_CARGO_CREATION - 0.00001
+    game.simulation.cargo_counter = SECONDS_BETWEEN_CARGO_CREATION - 0.00001
 
     game.on_update(1 / 60)
 
@@ -693,6 +741,47 @@ class TestTrainMoving:
         # For code coverage
         game.on_update(1 / 60)
 
+    def test_route_searches_are_counted_per_frame_and_per_train(self, game: Game):
+        create_objects(
+            game.grid,
+            """
+            . M . F .
+
+            .-S-.-S-.
+            """,
+        )
+        game.measure_route_searches = True
+        train = game._create_train(*game.grid.station_from_position.values())
+
+        while check(train.route_finder_stats.calls == 0):
+            game.on_update(1 / 60)
+
+        assert game.route_finder_stats_last_frame.calls > 0
+        assert game.route_finder_stats_last_frame.cache_misses == 1
+        assert train.route_finder_stats == game.route_finder_stats_last_frame
+
+        game.on_update(1 / 60)
+
+        assert game.route_finder_stats_last_frame.calls == 0
+        assert train.route_finder_stats.calls > 0
+
+    def test_route_searches_are_not_counted_unless_measured(self, game: Game):
+        create_objects(
+            game.grid,
+            """
+            . M . F .
+
+            .-S-.-S-.
+            """,
+        )
+        train = game._create_train(*game.grid.station_from_position.values())
+
+        while check(not train.rails_on_route):
+            game.on_update(1 / 60)
+
+        assert game.route_finder_stats_last_frame == RouteFinderStats()
+        assert train.route_finder_stats == RouteFinderStats()
+
     def test_train_speed_is_set_to_0_when_passing_corner(self, game: Game):
         """The train starts at 1,0 and the corner is at 60,0"""
         create_objects(
@@ -712,6 +801,150 @@ class TestTrainMoving:
         assert 1.9 < train.x < 2.1
 
 
+class TestFixedTimestep:
+    def test_simulation_ticks_at_fixed_rate_independent_of_frame_rate(
+        self, game: Game, monkeypatch
+    ):
+        game.ticks_per_second = 20
+        tick_lengths: list[float] = []
+        monkeypatch.setattr(game, "tick", tick_lengths.append)
+
+        for _ in range(3):
+            game.on_update(1 / 60)
+        assert tick_lengths == [1 / 20]
+        game.on_update(1 / 120)
+
+        assert game.tick_interpolation == approx(1 / 6)
+
+    def test_ticks_per_frame_are_limited(self, game: Game, monkeypatch):
+        tick_lengths: list[float] = []
+        monkeypatch.setattr(game, "tick", tick_lengths.append)
+
+        game.on_update(10.0)
+
+        assert len(tick_lengths) == MAX_SIMULATION_TICKS_PER_FRAME
+        assert game.tick_interpolation == 1.0
+
+    def test_train_remembers_position_at_previous_tick(self, game: Game):
+        create_objects(
+            game.grid,
+            """
+            . M . F .
+
+            .-S-.-S-.
+            """,
+        )
+        train = game._create_train(*game.grid.station_from_position.values())
+        while check(train.x == 1.0):
+            game.on_update(1 / 60)
+        x = train.x
+
+        game.on_update(1 / 60)
+
+        assert train.previous_x == x
+        assert train.x > x
+
+
+class TestFastForward:
+    def test_speed_box_cycles_through_time_scales(self, game: Game):
+        game.gui.boxes["SPEED"].click()
+        assert game.time_scale == 2
+        for _ in range(3):
+            game.gui.boxes["SPEED"].click()
+        assert game.time_scale == 1
+
+    def test_train_reserves_every_position_passed_in_one_fast_forwarded_update(
+        self, game: Game, monkeypatch
+    ):
+        create_objects(
+            game.grid,
+            """
+            . M . . . . . F .
+
+            .-S-.-.-.-.-.-S-.
+            """,
+        )
+        train = game._create_train(*game.grid.station_from_position.values())
+        game.on_update(1 / 60)
+        reserved_positions: list[Vec2] = []
+        reserve = game.signal_controller.reserve
+
+        def recording_reserve(reserver_id, positions, rails=()):
+            positions = list(positions)
+            reserved_positions.append(positions[0])
+            return reserve(reserver_id, positions, rails)
+
+        monkeypatch.setattr(game.signal_controller, "reserve", recording_reserve)
+        train.speed = train.MAX_SPEED
+        game.time_scale = 64
+
+        game.on_update(1 / 60)
+
+        assert train.x > 4
+        assert reserved_positions[:3] == [Vec2(2, 0), Vec2(3, 0), Vec2(4, 0)]
+
+
+class TestOffScreenTrains:
+    def _create_train_with_iron_to_deliver(self, game: Game) -> Train:
+        create_objects(
+            game.grid,
+            """
+            . M . . . F .
+
+            .-S-.-.-.-S-.
+            """,
+        )
+        train = game._create_train(*game.grid.station_from_position.values())
+        game.simulation.try_create_cargo_in_all_buildings()
+        return train
+
+    def test_train_off_screen_delivers_cargo_without_moving_every_tick(
+        self, game: Game, monkeypatch
+    ):
+        self._create_train_with_iron_to_deliver(game)
+        factory = game.grid.buildings[Vec2(5, 1)]
+        move_count = [0]
+        move = Train.move
+
+        def counting_move(self: Train, delta_time):
+            move_count[0] += 1
+            return move(self, delta_time)
+
+        monkeypatch.setattr(Train, "move", counting_move)
+        game.camera.move(Vec2(10000, 10000))
+
+        while check(not factory.cargo_count[CargoType.IRON]):
+            game.on_update(1 / 60)
+
+        assert move_count[0] == 0
+
+    def test_train_coming_back_on_screen_moves_every_tick_from_where_it_is(
+        self, game: Game
+    ):
+        train = self._create_train_with_iron_to_deliver(game)
+        game.camera.move(Vec2(10000, 10000))
+        while check(train.x < 2.0):
+            game.on_update(1 / 60)
+        game.camera.move(Vec2(0, 0))
+
+        game.on_update(1 / 60)
+        x = train.x
+        game.on_update(1 / 60)
+
+        assert 2.0 < x < train.x < 2.5
+
+    def test_train_off_screen_is_not_drawn(self, game: Game):
+        self._create_train_with_iron_to_deliver(game)
+        game.camera.move(Vec2(10000, 10000))
+
+        game.on_update(1 / 60)
+
+        assert not game.drawer._train_drawer._smoking_trains[0].visible
+        game.simplify_off_screen_trains = False
+        game.on_update(1 / 60)
+        assert game.drawer._train_drawer._smoking_trains[0].visible
+
+
 def test_fps_is_updated_every_second(game: Game):
     # For code coverage
     game.seconds_since_last_gui_figures_update = 0.99
@@ -731,7 +964,7 @@ def test_train_picks_up_iron_from_mine(game: Game):
     game._create_train(*game.grid.station_from_position.values())
     mine = game.grid.buildings[Vec2(1, 1)]
     train = game.trains[0]
-    game.try_create_cargo_in_all_buildings()
+    game.simulation.try_create_cargo_in_all_buildings()
     train.x = 1
     train.target_x = 1
     train._target_station = game.grid.station_from_position[Vec2(1, 0)]
@@ -747,6 +980,31 @@ def test_train_picks_up_iron_from_mine(game: Game):
     assert len(game.drawer.cargo_shape_element_list) == 0
 
 
+def test_train_loads_all_wagons_in_one_stop(game: Game):
+    create_objects(
+        game.grid,
+        """
+        . M . F .
+
+        .-S-.-S-.
+        """,
+    )
+    train = game._create_train(*game.grid.station_from_position.values())
+    train.add_wagon()
+    mine = game.grid.buildings[Vec2(1, 1)]
+    game.simulation.try_create_cargo_in_all_buildings()
+    game.simulation.try_create_cargo_in_all_buildings()
+    assert mine.cargo_count[CargoType.IRON] == 2
+    train._target_station = game.grid.station_from_position[Vec2(1, 0)]
+
+    game.on_update(1 / 60)
+
+    assert [wagon.cargo_count[CargoType.IRON] for wagon in train.wagons] == [1, 1]
+    assert mine.cargo_count[CargoType.IRON] == 0
+    assert len(game.drawer.cargo_shape_element_list) == 0
+    assert train.wait_timer == approx(2.0)
+
+
 def test_train_delivers_iron_to_market_gives_money(game: Game):
     create_objects(
         game.grid,
@@ -886,6 +1144,28 @@ class TestSignals:
         assert blocks[0].positions == frozenset({Vec2(0, 0), Vec2(1, 0)})
         assert blocks[1].positions == frozenset({Vec2(2, 0), Vec2(3, 0)})
 
+    def test_large_signal_block_rebuild_is_swapped_in_on_update(
+        self, game: Game, monkeypatch
+    ):
+        monkeypatch.setattr(
+            signal_controller, "MIN_POSITIONS_FOR_BACKGROUND_REBUILD", 0
+        )
+        create_objects(
+            game.grid,
+            """
+            .-.-.-.
+            """,
+        )
+        game.grid.toggle_signals_at_grid_position(1, 0)
+        assert len(game.signal_controller._signal_blocks) == 1
+
+        rebuild = game.signal_controller._signal_block_rebuild
+        assert rebuild
+        rebuild[0].result()
+        game.on_update(1 / 60)
+
+        assert len(game.signal_controller._signal_blocks) == 2
+
     def test_clicking_grid_in_signal_mode_creates_signal(self, game: Game):
         create_objects(
             game.grid,
@@ -1098,6 +1378,41 @@ class TestTrainMovingAroundSignals:
         # Train chooses north route
         assert train.y > 1
 
+    def test_train_goes_around_reserved_block_without_searching_at_every_position(
+        self, game: Game
+    ):
+        create_objects(
+            game.grid,
+            r"""
+            .-.-.-.-.-.-.
+            v           v
+            Sh.-S-.-S-.hS
+
+            M . M . F . F
+            """,
+        )
+        stations = sorted(
+            game.grid.station_from_position.values(),
+            key=lambda station: station.positions[0],
+        )
+        # As if another train was in the block between the signals
+        game.signal_controller.reserve(-1, [Vec2(3, 1)])
+        train = game._create_train(stations[0], stations[3])
+
+        with collect_route_finder_stats(RouteFinderStats()):
+            while check(train.x < 1):
+                game.on_update(1 / 60)
+            # The train went north, around the reserved block
+            assert train.y > 1.5
+
+            game.signal_controller.release(-1)
+            while check(train._target_station != stations[0]):
+                game.on_update(1 / 60)
+
+        # Only the distances to the target station were searched for
+        assert train.route_finder_stats.calls == 1
+        assert train.route_finder_stats.cache_hits > 5
+
     def test_if_a_train_is_destroyed_the_signals_become_green(self, game: Game):
         create_objects(
             game.grid,
@@ -1112,18 +1427,167 @@ class TestTrainMovingAroundSignals:
         while check(train.speed == 0.0):
             game.on_update(1 / 60)
 
-        # Currently, the block can be reserved either by the train or
-        # one of its wagons
-        train_and_wagon_ids = {id(train)} | {id(wagon) for wagon in train.wagons}
-        assert (
-            game.signal_controller._signal_blocks[0].reserved_by in train_and_wagon_ids
-        )
+        assert game.signal_controller._signal_blocks[0].reserved_by == train.entity_id
 
         train.destroy()
 
         assert game.signal_controller._signal_blocks[0].reserved_by is None
 
 
+def _create_two_trains_on_parallel_tracks_in_same_block(game: Game):
+    create_objects(
+        game.grid,
+        """
+        S-.-.-S
+          |
+        . . . .
+          |
+        S-.-.-S
+        """,
+    )
+    stations = game.grid.station_from_position
+    return (
+        game._create_train(stations[Vec2(0, 0)], stations[Vec2(3, 0)]),
+        game._create_train(stations[Vec2(0, 2)], stations[Vec2(3, 2)]),
+    )
+
+
+class TestPathBasedSignalling:
+    def test_block_based_signalling_lets_one_train_at_a_time_into_block(
+        self, game: Game
+    ):
+        train1, train2 = _create_two_trains_on_parallel_tracks_in_same_block(game)
+        for _ in range(120):
+            game.on_update(1 / 60)
+
+        assert train1.x > 0
+        assert train2.x == 0
+
+    def test_path_based_signalling_lets_trains_with_disjoint_paths_into_block(
+        self, game: Game
+    ):
+        game.setup(Terrain(water=[Vec2(210, 210)]), path_based=True)
+        game.grid.buildings = {}
+        train1, train2 = _create_two_trains_on_parallel_tracks_in_same_block(game)
+        for _ in range(120):
+            game.on_update(1 / 60)
+
+        assert train1.x > 0
+        assert train2.x > 0
+
+
+class TestWaitQueues:
+    def test_train_waiting_at_signal_does_not_retry_until_woken_up(
+        self, game: Game, monkeypatch
+    ):
+        train1, train2 = _create_two_trains_on_parallel_tracks_in_same_block(game)
+        for _ in range(120):
+            game.on_update(1 / 60)
+        assert train2._is_waiting_for_signal
+
+        retries: list[float] = []
+        on_reached_target = Train._on_reached_target
+
+        def counting_on_reached_target(self: Train):
+            if self is train2:
+                retries.append(self.x)
+            return on_reached_target(self)
+
+        monkeypatch.setattr(Train, "_on_reached_target", counting_on_reached_target)
+        for _ in range(120):
+            game.on_update(1 / 60)
+        assert not retries
+
+        game.simulation.destroy_train(train1)
+        for _ in range(10):
+            game.on_update(1 / 60)
+
+        assert retries
+        assert train2.x > 0
+
+
+class TestDeadlocks:
+    def _create_two_trains_head_on(self, game: Game, monkeypatch) -> list[str]:
+        create_objects(
+            game.grid,
+            """
+            S-.-.-.-.-.-S
+            """,
+        )
+        game.grid.toggle_signals_at_grid_position(3, 0)
+        stations = game.grid.station_from_position
+        game._create_train(stations[Vec2(0, 0)], stations[Vec2(6, 0)])
+        game._create_train(stations[Vec2(6, 0)], stations[Vec2(0, 0)])
+        toasts: list[str] = []
+        monkeypatch.setattr(game.gui, "toast", toasts.append)
+        return toasts
+
+    def test_deadlock_is_reported_once(self, game: Game, monkeypatch):
+        game.simulation.resolve_deadlocks = False
+        toasts = self._create_two_trains_head_on(game, monkeypatch)
+        for _ in range(600):
+            game.on_update(1 / 60)
+
+        assert toasts == ["Deadlock between 2 trains"]
+        assert all(train.speed == 0 for train in game.trains)
+
+    def test_one_train_backs_off_from_deadlock(self, game: Game, monkeypatch):
+        toasts = self._create_two_trains_head_on(game, monkeypatch)
+        backed_off_trains: list[Train] = []
+
+        def back_off(self: Train):
+            backed_off_trains.append(self)
+
+        monkeypatch.setattr(Train, "back_off", back_off)
+        while check(not toasts):
+            game.on_update(1 / 60)
+
+        assert len(backed_off_trains) == 1
+
+    @pytest.mark.parametrize("method", [Train.replan_route, Train.back_off])
+    def test_train_that_stops_waiting_leaves_wait_queues(
+        self, game: Game, monkeypatch, method
+    ):
+        game.simulation.resolve_deadlocks = False
+        toasts = self._create_two_trains_head_on(game, monkeypatch)
+        while check(not toasts):
+            game.on_update(1 / 60)
+        train = game.trains[0]
+        assert train.is_waiting_for_signal
+
+        method(train)
+
+        assert not train.is_waiting_for_signal
+        assert all(
+            train.entity_id not in wake_up_from_reserver_id
+            for wake_up_from_reserver_id in (
+                game.signal_controller._wake_up_from_reserver_id_from_block_id.values()
+            )
+        )
+
+    def test_train_polling_for_a_route_is_not_part_of_a_deadlock(self, game: Game):
+        create_objects(
+            game.grid,
+            """
+            . M . . . F .
+
+            .-S-.-.-.-S-.
+            """,
+        )
+        train = game._create_train(*game.grid.station_from_position.values())
+        game.grid.remove_rail(Vec2(3, 0))
+        # Stop at the first station, which reserves and thereby stops any wait
+        game.on_update(1 / 60)
+        other_train_id = train.entity_id + 1
+        # Woken up after waiting, but then finds no route and polls instead
+        game.signal_controller.wait_for(train.entity_id, [other_train_id])
+
+        while check(train.wait_timer == 0):
+            game.on_update(1 / 60)
+
+        assert game.signal_controller.wait_for(other_train_id, [train.entity_id]) == []
+
+
 class TestReserveAndUnreserveRail:
     def test_train_reserves_block_when_moving(self, game: Game):
         """Sends a train right and asserts that it stops reserving the first block
@@ -1140,7 +1604,7 @@ class TestReserveAndUnreserveRail:
         while check(train.speed == 0.0):
             game.on_update(1 / 60)
 
-        assert game.signal_controller._signal_blocks[0].reserved_by == id(train)
+        assert game.signal_controller._signal_blocks[0].reserved_by == train.entity_id
 
     def test_a_train_with_a_single_wagon_reserves_both_blocks_when_leaving(
         self, game: Game
@@ -1156,18 +1620,15 @@ class TestReserveAndUnreserveRail:
         )
         train = game._create_train(*game.grid.station_from_position.values())
         game.on_update(1 / 60)
-        left_signal_block = game.signal_controller._signal_block_from_position[
-            Vec2(1, 0)
-        ]
-        right_signal_block = game.signal_controller._signal_block_from_position[
-            Vec2(4, 0)
-        ]
-        assert left_signal_block.reserved_by == id(train)
+        left_signal_block = game.signal_controller._signal_block_at(Vec2(1, 0))
+        right_signal_block = game.signal_controller._signal_block_at(Vec2(4, 0))
+        assert left_signal_block and right_signal_block
+        assert left_signal_block.reserved_by == train.entity_id
         while check(not right_signal_block.reserved_by):
             game.on_update(1 / 60)
 
-        assert left_signal_block.reserved_by == id(train)
-        assert right_signal_block.reserved_by == id(train)
+        assert left_signal_block.reserved_by == train.entity_id
+        assert right_signal_block.reserved_by == train.entity_id
 
     def test_a_train_with_one_wagon_eventually_unreserves_first_block(self, game: Game):
         create_objects(
@@ -1180,16 +1641,13 @@ class TestReserveAndUnreserveRail:
         )
         train = game._create_train(*game.grid.station_from_position.values())
         game.on_update(1 / 60)
-        left_signal_block = game.signal_controller._signal_block_from_position[
-            Vec2(1, 0)
-        ]
-        right_signal_block = game.signal_controller._signal_block_from_position[
-            Vec2(4, 0)
-        ]
-        while check(left_signal_block.reserved_by == id(train)):
+        left_signal_block = game.signal_controller._signal_block_at(Vec2(1, 0))
+        right_signal_block = game.signal_controller._signal_block_at(Vec2(4, 0))
+        assert left_signal_block and right_signal_block
+        while check(left_signal_block.reserved_by == train.entity_id):
             game.on_update(1 / 60)
 
-        assert right_signal_block.reserved_by == id(train)
+        assert right_signal_block.reserved_by == train.entity_id
 
     def test_a_train_with_one_wagon_can_reserve_two_signal_blocks(self, game: Game):
         """Sends a train right and asserts that it eventually reserves both blocks"""
@@ -1212,12 +1670,16 @@ class TestReserveAndUnreserveRail:
         while check(train.speed == 0.0):
             game.on_update(1 / 60)
 
-        assert signal_blocks[0].reserved_by == id(train)
+        assert signal_blocks[0].reserved_by == train.entity_id
 
         while check(not signal_blocks[1].reserved_by):
             game.on_update(1 / 60)
 
-        assert signal_blocks[1].reserved_by == signal_blocks[0].reserved_by == id(train)
+        assert (
+            signal_blocks[1].reserved_by
+            == signal_blocks[0].reserved_by
+            == train.entity_id
+        )
 
 
 class TestPlayer:
@@ -1282,3 +1744,36 @@ def test_destroy_train_button(game: Game):
     assert len(game.trains) == 1
     game.gui.boxes["DESTROY\nTRAIN"].click()
     assert len(game.trains) == 0
+
+
+def test_train_stops_at_free_platform_when_other_train_is_at_station(game: Game):
+    create_objects(
+        game.grid,
+        r"""
+        . . . . . F . .
+
+        . M . . .hS-Sh.
+               /       \
+        .-S-S-.-.hS-Sh.-.
+        """,
+    )
+    first_station = game.grid.station_from_position[Vec2(1, 0)]
+    bottom_platform = game.grid.station_from_position[Vec2(5, 0)]
+    top_platform = game.grid.station_from_position[Vec2(5, 1)]
+    train1 = game._create_train(bottom_platform, first_station)
+    while check(
+        Vec2(train1.target_x, train1.target_y) != Vec2(6, 0) or train1.speed != 0
+    ):
+        game.on_update(1 / 60)
+    # Stay at the station
+    train1.wait_timer = 1000
+
+    train2 = game._create_train(first_station, bottom_platform)
+    while check(
+        Vec2(train2.target_x, train2.target_y) != Vec2(6, 1) or train2.speed != 0
+    ):
+        game.on_update(1 / 60)
+
+    assert Vec2(train1.target_x, train1.target_y) == Vec2(6, 0)
+    assert Vec2(train2.target_x, train2.target_y) in top_platform.positions
+    assert train2.next_station(top_platform) == first_station
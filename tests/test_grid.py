@@ -127,6 +127,52 @@ class TestBuildRail:
         assert rail.legal
 
 
+class TestDistancesToStation:
+    def test_distances_are_cached_until_rail_is_removed(self, grid: Grid):
+        create_objects(
+            grid,
+            """
+            . M . F .
+
+            .-S-.-S-.
+            """,
+        )
+        target_station = grid.station_from_position[Vec2(3, 0)]
+        distances = grid.distances_to_station(target_station)
+        assert list(distances.shortest_routes(Vec2(1, 0), {Rail(1, 0, 2, 0)})) == [
+            [Rail(1, 0, 2, 0), Rail(2, 0, 3, 0)]
+        ]
+        assert grid.distances_to_station(target_station) is distances
+
+        grid.remove_rail(Vec2(0, 0))
+
+        assert grid.distances_to_station(target_station) is not distances
+
+    def test_least_recently_used_distances_are_dropped_first(
+        self, grid: Grid, monkeypatch
+    ):
+        monkeypatch.setattr("trainfinity2.grid.MAX_CACHED_DISTANCES_TO_STATIONS", 2)
+        create_objects(
+            grid,
+            """
+            . M . F . m .
+
+            .-S-.-S-.-S-.
+            """,
+        )
+        station1, station2, station3 = [
+            grid.station_from_position[Vec2(x, 0)] for x in (1, 3, 5)
+        ]
+        distances1 = grid.distances_to_station(station1)
+        distances2 = grid.distances_to_station(station2)
+        grid.distances_to_station(station1)
+
+        grid.distances_to_station(station3)
+
+        assert grid.distances_to_station(station1) is distances1
+        assert grid.distances_to_station(station2) is not distances2
+
+
 def test_destroy_rail_by_clicking_and_dragging(grid: Grid):
     create_objects(
         grid,
@@ -137,3 +183,59 @@ def test_destroy_rail_by_clicking_and_dragging(grid: Grid):
     assert len(grid.rails) == 1
     grid.click_and_drag(0, 0, 0, 0, Mode.DESTROY)
     assert len(grid.rails) == 0
+
+
+class TestPlatforms:
+    def test_parallel_stations_next_to_each_other_are_platforms(self, grid: Grid):
+        create_objects(
+            grid,
+            """
+            . M . .
+
+            .-S-S-.
+
+            .-S-S-.
+
+            .-S-S-.
+
+            . . . .
+
+            .-S-S-.
+            """,
+        )
+        platforms = grid.platforms(grid.station_from_position[Vec2(1, 2)])
+        assert set(platforms) == {
+            Station((Vec2(1, 2), Vec2(2, 2))),
+            Station((Vec2(1, 3), Vec2(2, 3))),
+            Station((Vec2(1, 4), Vec2(2, 4))),
+        }
+        assert platforms[0] == Station((Vec2(1, 2), Vec2(2, 2)))
+
+    def test_platforms_share_the_buildings_next_to_any_of_them(self, grid: Grid):
+        create_objects(
+            grid,
+            """
+            . M . .
+
+            .-S-S-.
+
+            .-S-S-.
+
+            . . . .
+            """,
+        )
+        station = grid.station_from_position[Vec2(1, 1)]
+        assert grid.buildings_at_station(station) == [grid.buildings[Vec2(1, 3)]]
+
+    def test_can_build_platform_next_to_station_away_from_buildings(self, grid: Grid):
+        create_objects(
+            grid,
+            """
+            . M . .
+
+            .-S-S-.
+
+            . . . .
+            """,
+        )
+        assert not grid._illegal_station_positions(Station((Vec2(1, 0), Vec2(2, 0))))
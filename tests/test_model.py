@@ -1,3 +1,5 @@
+import math
+import tracemalloc
 import pytest
 from pyglet.math import Vec2
 from trainfinity2.grid import Grid
@@ -85,6 +87,37 @@ class TestTrain:
 
         assert train.y < 0
 
+    def test_move_diagonally_at_same_speed(self, train):
+        train._update_current_rail_and_target_xy(Rail(0, 0, 1, 1), 0, 0)
+        train.speed = train.MAX_SPEED
+        train.move(1 / 60)
+
+        distance = train.MAX_SPEED / 60
+        assert train.x == pytest.approx(distance / math.sqrt(2))
+        assert train.y == pytest.approx(distance / math.sqrt(2))
+
+    def test_trains_are_small(self, train: Train):
+        tracemalloc.start()
+        try:
+            memory_before, _ = tracemalloc.get_traced_memory()
+            trains = [
+                Train(
+                    train.first_station_position,
+                    train.second_station_position,
+                    train.grid,
+                    train.signal_controller,
+                )
+                for _ in range(100)
+            ]
+            memory_after, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert not hasattr(train, "__dict__")
+        assert not hasattr(train.wagons[0], "__dict__")
+        # Bytes per train with one wagon
+        assert (memory_after - memory_before) / len(trains) < 1200
+
 
 # class TestSignal:
 #     def test_calling_other_rail_with_nonadjacent_rail_throws_error(self):
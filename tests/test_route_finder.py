@@ -1,7 +1,13 @@
 from tests.util import create_objects
 from trainfinity2.game import Game
 from trainfinity2.model import Rail
-from trainfinity2.route_finder import find_route
+from trainfinity2.route_finder import (
+    DistancesToStation,
+    RouteFinderStats,
+    collect_route_finder_stats,
+    find_route,
+    find_route_to_closest_station,
+)
 from pyglet.math import Vec2
 
 
@@ -78,3 +84,171 @@ class TestFindRoute:
             target_station=station1,
         )
         assert result is None
+
+
+class TestFindRouteToClosestStation:
+    def test_stops_at_closest_station(self, game: Game):
+        create_objects(
+            game.grid,
+            """
+            . M . F . F .
+
+            .-S-.-S-.-S-.
+            """,
+        )
+        station1, station2, station3 = sorted(
+            game.grid.station_from_position.values(),
+            key=lambda station: station.positions[0],
+        )
+        assert find_route_to_closest_station(
+            game.grid.possible_next_rails_ignore_red_lights,
+            starting_rails={Rail(1, 0, 2, 0)},
+            initial_position=Vec2(1, 0),
+            target_stations=[station3, station2],
+        ) == (station2, [Rail(1, 0, 2, 0), Rail(2, 0, 3, 0)])
+
+    def test_no_target_stations(self, game: Game):
+        create_objects(
+            game.grid,
+            """
+            . M . F .
+
+            .-S-.-S-.
+            """,
+        )
+        assert (
+            find_route_to_closest_station(
+                game.grid.possible_next_rails_ignore_red_lights,
+                starting_rails={Rail(1, 0, 2, 0)},
+                initial_position=Vec2(1, 0),
+                target_stations=[],
+            )
+            is None
+        )
+
+
+class TestDistancesToStation:
+    def test_finds_routes_both_ways_around_loop_shortest_first(self, game: Game):
+        create_objects(
+            game.grid,
+            r"""
+            .-.-.-.-.-.-.
+            |           |
+            S-.-.-.-.-.-S
+
+            M . . . . . F
+            """,
+        )
+        station1, station2 = sorted(
+            game.grid.station_from_position.values(),
+            key=lambda station: station.positions[0],
+        )
+        distances = DistancesToStation(
+            game.grid.possible_next_rails_ignore_red_lights, station2
+        )
+        routes = list(
+            distances.shortest_routes(
+                Vec2(0, 1), game.grid.rails_at_position(Vec2(0, 1))
+            )
+        )
+        assert routes[0] == find_route(
+            game.grid.possible_next_rails_ignore_red_lights,
+            starting_rails={Rail(0, 1, 1, 1)},
+            initial_position=Vec2(0, 1),
+            target_station=station2,
+        )
+        assert routes[1] == [
+            Rail(0, 1, 0, 2),
+            *(Rail(x, 2, x + 1, 2) for x in range(6)),
+            Rail(6, 2, 6, 1),
+        ]
+
+    def test_no_route(self, game: Game):
+        create_objects(
+            game.grid,
+            r"""
+            S-. . S
+
+            M . . F
+            """,
+        )
+        station1, station2 = sorted(
+            game.grid.station_from_position.values(),
+            key=lambda station: station.positions[0],
+        )
+        distances = DistancesToStation(
+            game.grid.possible_next_rails_ignore_red_lights, station2
+        )
+        assert (
+            list(
+                distances.shortest_routes(
+                    Vec2(0, 1), game.grid.rails_at_position(Vec2(0, 1))
+                )
+            )
+            == []
+        )
+
+
+class TestRouteFinderStats:
+    def test_searches_are_counted_in_all_nested_collectors(self, game: Game):
+        create_objects(
+            game.grid,
+            """
+            . M . F .
+
+            .-S-.-S-.
+            """,
+        )
+        station1, station2 = sorted(
+            game.grid.station_from_position.values(),
+            key=lambda station: station.positions[0],
+        )
+        outer_stats = RouteFinderStats()
+        inner_stats = RouteFinderStats()
+        with collect_route_finder_stats(outer_stats):
+            with collect_route_finder_stats(inner_stats):
+                find_route(
+                    game.grid.possible_next_rails_ignore_red_lights,
+                    starting_rails={Rail(1, 0, 2, 0)},
+                    initial_position=Vec2(1, 0),
+                    target_station=station2,
+                )
+            find_route(
+                game.grid.possible_next_rails_ignore_red_lights,
+                starting_rails={Rail(1, 0, 2, 0)},
+                initial_position=Vec2(1, 0),
+                target_station=station2,
+            )
+
+        assert inner_stats.calls == 1
+        assert inner_stats.route_length == 2
+        assert inner_stats.nodes_popped == 3
+        assert inner_stats.heap_pushes == 3
+        assert inner_stats.edges_relaxed == 2
+        assert outer_stats.calls == 2
+        assert outer_stats.route_length == 4
+
+    def test_searches_are_not_counted_outside_collector(self, game: Game):
+        create_objects(
+            game.grid,
+            """
+            . M . F .
+
+            .-S-.-S-.
+            """,
+        )
+        station1, station2 = sorted(
+            game.grid.station_from_position.values(),
+            key=lambda station: station.positions[0],
+        )
+        stats = RouteFinderStats()
+        with collect_route_finder_stats(stats):
+            pass
+        find_route(
+            game.grid.possible_next_rails_ignore_red_lights,
+            starting_rails={Rail(1, 0, 2, 0)},
+            initial_position=Vec2(1, 0),
+            target_station=station2,
+        )
+
+        assert stats == RouteFinderStats()
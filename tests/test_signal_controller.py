@@ -1,6 +1,11 @@
+import csv
+import io
+import pytest
 from pyglet.math import Vec2
-from trainfinity2.model import Rail, Signal
-from trainfinity2.signal_controller import SignalController
+from trainfinity2.events import CreateEvent
+from trainfinity2.model import Rail, Signal, SignalColor
+from trainfinity2 import signal_controller
+from trainfinity2.signal_controller import DeadlockEvent, SignalController
 
 
 class Rails:
@@ -24,8 +29,338 @@ class TestCreateSignalBlocks:
         signals = [signal1, signal2]
 
         controller.create_signal_blocks(rail_collection=rails, signals=signals)
-        signal_block_1, signal_block_2 = controller._signal_blocks
+        signal_block_2, signal_block_1 = sorted(
+            controller._signal_blocks, key=lambda b: sorted(b.positions)[0].x
+        )
         assert signal_block_1.positions == {Vec2(60, 0), Vec2(90, 0)}
         assert signal_block_2.positions == {Vec2(0, 0), Vec2(30, 0)}
         assert signal_block_1.signals == frozenset({signal1})
         assert signal_block_2.signals == frozenset({signal2})
+
+
+class TestUpdateSignalBlocks:
+    def test_adding_signal_only_recreates_affected_block(self):
+        controller = SignalController()
+        rail1 = Rail(0, 0, 1, 0)
+        rail2 = Rail(1, 0, 2, 0)
+        rail3 = Rail(2, 0, 3, 0)
+        rail4 = Rail(3, 0, 4, 0)
+        rails = Rails({rail1, rail2, rail3, rail4})
+        signal1 = Signal(Vec2(1, 0), rail2)
+        signal2 = Signal(Vec2(2, 0), rail2)
+        controller.create_signal_blocks(
+            rail_collection=rails, signals=[signal1, signal2]
+        )
+        left_block = controller._signal_block_at(Vec2(0, 0))
+
+        signal3 = Signal(Vec2(3, 0), rail4)
+        signal4 = Signal(Vec2(4, 0), rail4)
+        controller.update_signal_blocks(
+            rails, rail4.positions, added_signals=[signal3, signal4]
+        )
+
+        assert controller._signal_block_at(Vec2(0, 0)) is left_block
+        assert len(controller._signal_blocks) == 3
+        middle_block = controller._signal_block_at(Vec2(3, 0))
+        right_block = controller._signal_block_at(Vec2(4, 0))
+        assert middle_block and right_block
+        assert middle_block.positions == {Vec2(2, 0), Vec2(3, 0)}
+        assert right_block.positions == {Vec2(4, 0)}
+
+    def test_removing_rail_splits_block(self):
+        controller = SignalController()
+        rail1 = Rail(0, 0, 1, 0)
+        rail2 = Rail(1, 0, 2, 0)
+        rails = Rails({rail1, rail2})
+        controller.create_signal_blocks(rail_collection=rails, signals=[])
+        assert len(controller._signal_blocks) == 1
+
+        rails.rails.remove(rail1)
+        controller.update_signal_blocks(rails, rail1.positions)
+
+        assert len(controller._signal_blocks) == 1
+        assert controller._signal_blocks[0].positions == {Vec2(1, 0), Vec2(2, 0)}
+        assert controller._signal_block_at(Vec2(0, 0)) is None
+
+    def test_reservations_are_kept_for_recreated_blocks(self):
+        controller = SignalController()
+        rail1 = Rail(0, 0, 1, 0)
+        rail2 = Rail(1, 0, 2, 0)
+        rails = Rails({rail1})
+        controller.create_signal_blocks(rail_collection=rails, signals=[])
+        controller.reserve(1, [Vec2(0, 0)])
+
+        rails.rails.add(rail2)
+        controller.update_signal_blocks(rails, rail2.positions)
+
+        assert controller.reserver(Vec2(2, 0)) == 1
+
+
+class TestBackgroundRebuild:
+    def test_signal_blocks_are_kept_until_rebuild_is_swapped_in(self, monkeypatch):
+        monkeypatch.setattr(
+            signal_controller, "MIN_POSITIONS_FOR_BACKGROUND_REBUILD", 0
+        )
+        controller = SignalController()
+        rail1 = Rail(0, 0, 1, 0)
+        rail2 = Rail(1, 0, 2, 0)
+        rail3 = Rail(2, 0, 3, 0)
+        rails = Rails({rail1, rail2, rail3})
+        controller.create_signal_blocks(rail_collection=rails, signals=[])
+        controller.reserve(1, [Vec2(0, 0)])
+        signal1 = Signal(Vec2(1, 0), rail2)
+        signal2 = Signal(Vec2(2, 0), rail2)
+
+        controller.update_signal_blocks(
+            rails, rail2.positions, added_signals=[signal1, signal2], in_background=True
+        )
+        assert len(controller._signal_blocks) == 1
+        assert controller.reserver(Vec2(3, 0)) == 1
+
+        assert controller.finish_signal_block_rebuild() == [CreateEvent(signal2)]
+        assert len(controller._signal_blocks) == 2
+        assert controller.reserver(Vec2(1, 0)) == 1
+        assert controller.reserver(Vec2(3, 0)) is None
+        assert controller.swap_in_rebuilt_signal_blocks() == []
+
+
+class TestReserve:
+    def _controller_with_two_blocks(self) -> tuple[SignalController, Signal, Signal]:
+        controller = SignalController()
+        rail1 = Rail(0, 0, 1, 0)
+        rail2 = Rail(1, 0, 2, 0)
+        rail3 = Rail(2, 0, 3, 0)
+        signal1 = Signal(Vec2(1, 0), rail2)
+        signal2 = Signal(Vec2(2, 0), rail2)
+        controller.create_signal_blocks(
+            rail_collection=Rails({rail1, rail2, rail3}), signals=[signal1, signal2]
+        )
+        return controller, signal1, signal2
+
+    def test_events_only_for_signals_that_change_color(self):
+        controller, signal1, signal2 = self._controller_with_two_blocks()
+
+        assert controller.reserve(1, [Vec2(0, 0)]) == [CreateEvent(signal2)]
+        assert signal2.signal_color == SignalColor.RED
+        assert controller.reserve(1, [Vec2(0, 0), Vec2(1, 0)]) == []
+        assert controller.reserve(1, [Vec2(1, 0), Vec2(2, 0)]) == [CreateEvent(signal1)]
+        assert controller.reserve(1, [Vec2(2, 0)]) == [CreateEvent(signal2)]
+        assert signal2.signal_color == SignalColor.GREEN
+
+    def test_block_is_kept_by_first_reserver(self):
+        controller, _, _ = self._controller_with_two_blocks()
+        controller.reserve(1, [Vec2(0, 0)])
+        controller.reserve(2, [Vec2(1, 0)])
+
+        assert controller.reserver(Vec2(1, 0)) == 1
+
+        controller.reserve(1, [])
+
+        assert controller.reserver(Vec2(1, 0)) == 2
+
+    def test_release_purges_reserver(self):
+        controller, _, signal2 = self._controller_with_two_blocks()
+        controller.reserve(1, [Vec2(0, 0)])
+
+        assert controller.release(1) == [CreateEvent(signal2)]
+        assert controller.reserver(Vec2(0, 0)) is None
+        assert 1 not in controller._reserved_positions_from_reserver_id
+
+
+class TestPathBasedReservations:
+    def _controller(self, rails: set[Rail]) -> SignalController:
+        controller = SignalController(path_based=True)
+        controller.create_signal_blocks(rail_collection=Rails(rails), signals=[])
+        return controller
+
+    def test_reservers_with_disjoint_paths_share_block(self):
+        controller = self._controller({Rail(0, 0, 1, 0), Rail(1, 0, 1, 1)})
+        controller.reserve(1, [Vec2(0, 0)])
+
+        assert controller.reserver(Vec2(0, 0)) == 1
+        assert controller.reserver(Vec2(1, 1)) is None
+        assert controller.can_reserve(2, [Vec2(1, 1)])
+        assert not controller.can_reserve(2, [Vec2(1, 1), Vec2(0, 0)])
+
+    def test_crossing_diagonal_rails_conflict(self):
+        rail1 = Rail(0, 0, 1, 1)
+        rail2 = Rail(0, 1, 1, 0)
+        controller = self._controller({rail1, rail2})
+        controller.reserve(1, [Vec2(0, 0), Vec2(1, 1)], [rail1])
+
+        assert not controller.can_reserve(2, [Vec2(0, 1), Vec2(1, 0)], [rail2])
+        assert controller.can_reserve(1, [Vec2(0, 1), Vec2(1, 0)], [rail2])
+
+        controller.release(1)
+
+        assert controller.can_reserve(2, [Vec2(0, 1), Vec2(1, 0)], [rail2])
+
+    def test_mode_cannot_be_changed_after_creation(self):
+        controller = self._controller({Rail(0, 0, 1, 0)})
+        controller.reserve(1, [Vec2(0, 0)])
+
+        with pytest.raises(AttributeError):
+            controller.path_based = False  # type: ignore[misc]
+
+    def test_path_through_block_stops_at_next_block(self):
+        rail1 = Rail(0, 0, 1, 0)
+        rail2 = Rail(1, 0, 2, 0)
+        rail3 = Rail(2, 0, 3, 0)
+        rail4 = Rail(3, 0, 4, 0)
+        controller = SignalController(path_based=True)
+        controller.create_signal_blocks(
+            rail_collection=Rails({rail1, rail2, rail3, rail4}),
+            signals=[Signal(Vec2(2, 0), rail3)],
+        )
+
+        assert controller.path_through_block(
+            Vec2(0, 0), [rail1, rail2, rail3, rail4]
+        ) == ([Vec2(1, 0), Vec2(2, 0)], [rail1, rail2])
+
+
+class TestWaitFor:
+    def test_cycle_of_waiting_reservers_is_a_deadlock(self):
+        controller = SignalController()
+
+        assert controller.wait_for(1, [2]) == []
+        assert controller.wait_for(2, [3]) == []
+        assert controller.wait_for(3, [1]) == [DeadlockEvent((3, 1, 2))]
+
+    def test_deadlock_is_reported_again_only_after_a_reserver_moved(self):
+        controller = SignalController()
+        controller.wait_for(1, [2])
+        controller.wait_for(2, [1])
+
+        assert controller.wait_for(2, [1]) == []
+
+        controller.reserve(1, [])
+
+        assert controller.wait_for(1, [2]) == [DeadlockEvent((1, 2))]
+
+    def test_reserver_that_stopped_waiting_is_not_part_of_a_deadlock(self):
+        controller = SignalController()
+        controller.wait_for(1, [2])
+
+        controller.stop_waiting_for_reservers(1)
+
+        assert controller.wait_for(2, [1]) == []
+
+
+class TestWakeUpWhenReleased:
+    def test_waiting_reserver_is_woken_up_once_when_block_changes_reserver(self):
+        controller, _, _ = TestReserve()._controller_with_two_blocks()
+        controller.reserve(1, [Vec2(0, 0), Vec2(1, 0)])
+        controller.reserve(2, [Vec2(2, 0)])
+        wake_ups = []
+        controller.wake_up_when_released(2, [Vec2(1, 0)], lambda: wake_ups.append(2))
+
+        controller.reserve(1, [Vec2(0, 0)])
+        assert wake_ups == []
+
+        controller.reserve(1, [])
+        controller.reserve(1, [Vec2(0, 0)])
+        assert wake_ups == [2]
+        assert not controller._wake_up_from_reserver_id_from_block_id
+
+    def test_released_reserver_leaves_wait_queues(self):
+        controller, _, _ = TestReserve()._controller_with_two_blocks()
+        controller.reserve(1, [Vec2(0, 0)])
+        controller.wake_up_when_released(2, [Vec2(0, 0)], lambda: None)
+
+        controller.release(2)
+
+        assert not controller._wake_up_from_reserver_id_from_block_id
+        assert not controller._block_ids_from_waiting_reserver_id
+
+    def test_waiting_reserver_is_woken_up_when_all_blocks_are_recreated(self):
+        controller = SignalController()
+        rails = Rails({Rail(0, 0, 1, 0), Rail(1, 0, 2, 0)})
+        controller.create_signal_blocks(rails, [])
+        controller.reserve(1, [Vec2(0, 0)])
+        wake_ups = []
+        controller.wake_up_when_released(2, [Vec2(1, 0)], lambda: wake_ups.append(2))
+
+        controller.create_signal_blocks(rails, [])
+
+        assert wake_ups == [2]
+        assert not controller._wake_up_from_reserver_id_from_block_id
+
+    def test_reserver_that_stops_waiting_is_not_woken_up(self):
+        controller, _, _ = TestReserve()._controller_with_two_blocks()
+        controller.reserve(1, [Vec2(0, 0)])
+        wake_ups = []
+        controller.wake_up_when_released(2, [Vec2(0, 0)], lambda: wake_ups.append(2))
+        controller.advance_time(2.0)
+
+        controller.stop_waiting_for_release(2)
+        controller.reserve(1, [])
+
+        assert wake_ups == []
+        assert controller.block_occupancy_report()[0].total_wait == 2.0
+
+
+class TestBlockOccupancy:
+    def test_reserved_time_reservations_refusals_and_waits_are_recorded(self):
+        controller, _, _ = TestReserve()._controller_with_two_blocks()
+        controller.reserve(1, [Vec2(0, 0), Vec2(1, 0)])
+        controller.advance_time(2.0)
+        controller.reserve(2, [Vec2(2, 0)])
+        controller.wake_up_when_released(2, [Vec2(1, 0)], lambda: None)
+        controller.advance_time(3.0)
+        controller.reserve(1, [])
+        controller.advance_time(1.0)
+
+        left_block, right_block = controller.block_occupancy_report()
+
+        assert left_block.positions == {Vec2(0, 0), Vec2(1, 0)}
+        assert left_block.reserved_time == 5.0
+        assert left_block.reservation_count == 1
+        assert left_block.refusal_count == 1
+        assert left_block.total_wait == 3.0
+        assert left_block.mean_wait == 3.0
+        assert right_block.reserved_time == 4.0
+        assert right_block.refusal_count == 0
+        assert right_block.mean_wait == 0.0
+
+    def test_csv_has_one_row_per_block(self):
+        controller, _, _ = TestReserve()._controller_with_two_blocks()
+        controller.reserve(1, [Vec2(0, 0)])
+        controller.advance_time(0.5)
+        file = io.StringIO()
+
+        controller.write_block_occupancy_csv(file)
+
+        rows = list(csv.reader(io.StringIO(file.getvalue())))
+        assert rows[0][:4] == ["block_id", "x", "y", "position_count"]
+        assert rows[1][1:8] == ["0", "0", "2", "0.500", "1", "0", "0.000"]
+        assert len(rows) == 3
+
+
+class TestBlockIds:
+    def test_block_ids_are_reused(self):
+        controller = SignalController()
+        rail1 = Rail(0, 0, 1, 0)
+        rail2 = Rail(1, 0, 2, 0)
+        rails = Rails({rail1, rail2})
+        signal = Signal(Vec2(1, 0), rail2)
+        controller.create_signal_blocks(rail_collection=rails, signals=[signal])
+        assert len(controller._signal_block_from_id) == 2
+
+        controller.update_signal_blocks(
+            rails, rail2.positions, removed_signals=[signal]
+        )
+        controller.update_signal_blocks(rails, rail2.positions, added_signals=[signal])
+
+        assert len(controller._signal_block_from_id) == 2
+        assert sorted(block.block_id for block in controller._signal_blocks) == [0, 1]
+
+    def test_reserver_is_read_from_block_id_array(self):
+        controller = SignalController()
+        rails = Rails({Rail(-40, -40, -41, -40), Rail(40, 40, 41, 40)})
+        controller.create_signal_blocks(rail_collection=rails, signals=[])
+        controller.reserve(1, [Vec2(40, 40)])
+
+        assert controller.reserver(Vec2(41, 40)) == 1
+        assert controller.reserver(Vec2(-41, -40)) is None
+        with pytest.raises(KeyError):
+            controller.reserver(Vec2(0, 0))
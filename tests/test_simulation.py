@@ -0,0 +1,121 @@
+import subprocess
+import sys
+
+import pytest
+from pyglet.math import Vec2
+
+from tests.util import create_objects
+from trainfinity2.events import CreateEvent, DestroyEvent, Event
+from trainfinity2.model import CargoSoldEvent
+from trainfinity2.sim import LevelUpEvent, Simulation
+from trainfinity2.sim.__main__ import main
+from trainfinity2.terrain import Terrain
+
+
+@pytest.fixture
+def simulation() -> Simulation:
+    # Add a single water tile, or real terrain will be generated
+    return Simulation(Terrain(water=[Vec2(210, 210)]))
+
+
+def test_simulation_does_not_import_arcade():
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, trainfinity2.sim; print('arcade' in sys.modules)",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "False"
+
+
+class TestSimulation:
+    def test_observers_are_told_about_levels_and_new_buildings(
+        self, simulation: Simulation
+    ):
+        events: list[Event] = []
+        simulation.observers.append(events.extend)
+
+        simulation.start()
+
+        assert isinstance(events[-1], LevelUpEvent)
+        assert [event for event in events if isinstance(event, CreateEvent)]
+
+    def test_observers_are_told_about_created_and_destroyed_trains(
+        self, simulation: Simulation
+    ):
+        create_objects(
+            simulation.grid,
+            """
+            . M . m .
+
+            .-S-.-S-.
+            """,
+        )
+        events: list[Event] = []
+        simulation.observers.append(events.extend)
+
+        train = simulation.create_train(*simulation.grid.station_from_position.values())
+        simulation.destroy_train(train)
+
+        assert events[0] == CreateEvent(train)
+        assert events[-1] == DestroyEvent(train)
+        assert simulation.trains == []
+
+    def test_train_delivering_iron_to_market_earns_money(self, simulation: Simulation):
+        create_objects(
+            simulation.grid,
+            """
+            . M . m .
+
+            .-S-.-S-.
+            """,
+        )
+        events: list[Event] = []
+        simulation.observers.append(events.extend)
+        simulation.create_train(*simulation.grid.station_from_position.values())
+        simulation.try_create_cargo_in_all_buildings()
+
+        for _ in range(200):
+            simulation.tick(1 / 20)
+
+        assert simulation.player.money > 0
+        assert [event for event in events if isinstance(event, CargoSoldEvent)]
+
+    def test_trains_with_disjoint_paths_share_block_in_path_based_mode(self):
+        simulation = Simulation(Terrain(water=[Vec2(210, 210)]), path_based=True)
+        create_objects(
+            simulation.grid,
+            """
+            S-.-.-S
+              |
+            . . . .
+              |
+            S-.-.-S
+            """,
+        )
+        stations = simulation.grid.station_from_position
+        train1 = simulation.create_train(stations[Vec2(0, 0)], stations[Vec2(3, 0)])
+        train2 = simulation.create_train(stations[Vec2(0, 2)], stations[Vec2(3, 2)])
+
+        for _ in range(120):
+            simulation.tick(1 / 60)
+
+        assert simulation.signal_controller.path_based
+        assert train1.x > 0
+        assert train2.x > 0
+
+
+def test_main_reports_ticks_per_second(capsys):
+    main(["--trains", "2", "--ticks", "10"])
+
+    assert "10 ticks with 2 trains" in capsys.readouterr().out
+
+
+def test_main_runs_path_based_signalling(capsys):
+    main(["--trains", "2", "--ticks", "10", "--path-based"])
+
+    assert "10 ticks with 2 trains" in capsys.readouterr().out
@@ -0,0 +1,100 @@
+from pyglet.math import Vec2
+
+from trainfinity2.model import (
+    CargoAddedEvent,
+    CargoRemovedEvent,
+    CargoType,
+    IronMine,
+    Market,
+    SteelWorks,
+)
+from trainfinity2.station_dwell import (
+    SECONDS_PER_CARGO_TRANSFERRED,
+    CargoTransfer,
+    apply_cargo_transfers,
+    dwell_time,
+    plan_cargo_transfers,
+)
+from trainfinity2.wagon import Wagon
+
+
+def _wagons(count: int) -> list[Wagon]:
+    return [Wagon(0, 0) for _ in range(count)]
+
+
+class TestPlanCargoTransfers:
+    def test_loads_as_much_as_there_is_space_for(self):
+        mine = IronMine(Vec2(0, 0))
+        mine.cargo_count[CargoType.IRON] = 5
+
+        transfers = plan_cargo_transfers(_wagons(3), [mine], {CargoType.IRON})
+
+        assert transfers == [CargoTransfer(mine, CargoType.IRON, 3)]
+
+    def test_loads_as_much_as_the_building_has(self):
+        mine = IronMine(Vec2(0, 0))
+        mine.cargo_count[CargoType.IRON] = 2
+
+        transfers = plan_cargo_transfers(_wagons(3), [mine], {CargoType.IRON})
+
+        assert transfers == [CargoTransfer(mine, CargoType.IRON, 2)]
+
+    def test_does_not_load_cargo_not_desired_at_next_station(self):
+        mine = IronMine(Vec2(0, 0))
+        mine.cargo_count[CargoType.IRON] = 2
+
+        assert plan_cargo_transfers(_wagons(3), [mine], {CargoType.COAL}) == []
+
+    def test_unloads_all_wagons_at_once(self):
+        wagons = _wagons(3)
+        for wagon in wagons[:2]:
+            wagon.cargo_count[CargoType.IRON] = 1
+        steel_works = SteelWorks(Vec2(0, 0))
+
+        transfers = plan_cargo_transfers(wagons, [steel_works, steel_works], set())
+
+        assert transfers == [CargoTransfer(steel_works, CargoType.IRON, -2)]
+
+    def test_cargo_is_only_unloaded_once_when_several_buildings_accept_it(self):
+        wagons = _wagons(1)
+        wagons[0].cargo_count[CargoType.IRON] = 1
+        market = Market(Vec2(0, 0))
+        steel_works = SteelWorks(Vec2(1, 0))
+
+        transfers = plan_cargo_transfers(wagons, [market, steel_works], set())
+
+        assert transfers == [CargoTransfer(market, CargoType.IRON, -1)]
+
+
+class TestApplyCargoTransfers:
+    def test_one_event_per_building_and_cargo_type(self):
+        wagons = _wagons(3)
+        for wagon in wagons:
+            wagon.cargo_count[CargoType.IRON] = 1
+        steel_works = SteelWorks(Vec2(0, 0))
+        mine = IronMine(Vec2(1, 0))
+        mine.cargo_count[CargoType.IRON] = 2
+        transfers = [
+            CargoTransfer(steel_works, CargoType.IRON, -3),
+            CargoTransfer(mine, CargoType.IRON, 2),
+        ]
+
+        events = apply_cargo_transfers(wagons, transfers)
+
+        assert events == [
+            CargoAddedEvent(Vec2(0, 0), CargoType.IRON, 3),
+            CargoRemovedEvent(Vec2(1, 0), 2),
+        ]
+        assert steel_works.cargo_count[CargoType.IRON] == 3
+        assert mine.cargo_count[CargoType.IRON] == 0
+        assert [wagon.cargo_count[CargoType.IRON] for wagon in wagons] == [1, 1, 0]
+
+    def test_dwell_time_is_proportional_to_cargo_transferred(self):
+        mine = IronMine(Vec2(0, 0))
+        transfers = [
+            CargoTransfer(mine, CargoType.IRON, -2),
+            CargoTransfer(mine, CargoType.IRON, 3),
+        ]
+
+        assert dwell_time(transfers) == 5 * SECONDS_PER_CARGO_TRANSFERRED
+        assert dwell_time([]) == 0
@@ -166,3 +166,17 @@ class TestCreateStations:
             Station(positions=(Vec2(1.0, 0.0), Vec2(2.0, 0.0), Vec2(3.0, 0.0))),
             Station(positions=(Vec2(5.0, 0.0), Vec2(6.0, 0.0), Vec2(7.0, 0.0))),
         }
+
+    def test_parallel_rows_are_separate_stations(self, game: Game):
+        create_objects(
+            game.grid,
+            """
+            .-S-S-.
+
+            .-S-S-.
+            """,
+        )
+        assert game.grid.stations == {
+            Station(positions=(Vec2(1.0, 0.0), Vec2(2.0, 0.0))),
+            Station(positions=(Vec2(1.0, 1.0), Vec2(2.0, 1.0))),
+        }
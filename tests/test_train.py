@@ -1,5 +1,6 @@
 from trainfinity2.train import (
     _find_equidistant_points_and_angles_along_line,
+    _PathBehindHead,
     PointAndAngle,
 )
 from pyglet.math import Vec2
@@ -39,6 +40,15 @@ class TestFindEquidistantPointsAndAnglesAlongLine:
             PointAndAngle(Vec2(3.0, 1.0), 0.0),
         ]
 
+    def test_point_on_corner_has_angle_of_line_towards_head(self):
+        line_points = [Vec2(1.0, 0.0), Vec2(4.0, 0.0), Vec2(2.0, 2.0)]
+        n = 3
+        distance = 1.0
+        points = list(
+            _find_equidistant_points_and_angles_along_line(line_points, n, distance)
+        )
+        assert points[-1] == PointAndAngle(Vec2(4.0, 0.0), 90.0)
+
     def test_repeatedly_return_last_point_of_line_if_line_runs_out(self):
         line_points = [Vec2(0.0, 0.0), Vec2(1.0, 0.0)]
         n = 2
@@ -50,3 +60,42 @@ class TestFindEquidistantPointsAndAnglesAlongLine:
             PointAndAngle(Vec2(1.0, 0.0), 0.0),
             PointAndAngle(Vec2(1.0, 0.0), 0.0),
         ]
+
+
+class TestPathBehindHead:
+    def test_points_follow_moving_head_without_changing_points(self):
+        path = _PathBehindHead([Vec2(1, 0), Vec2(1, 1), Vec2(1, 2)])
+
+        assert list(path.points_and_angles(1.5, 0.0, 2, 1.0)) == [
+            (1.0, 0.5, 0.0),
+            (1.0, 1.5, 0.0),
+        ]
+        assert list(path.points_and_angles(1.0, 0.0, 2, 1.0)) == [
+            (1.0, 1.0, 0.0),
+            (1.0, 2.0, 0.0),
+        ]
+
+    def test_points_without_line_are_at_head(self):
+        path = _PathBehindHead()
+
+        assert list(path.points_and_angles(0.5, 0.5, 2, 1.0)) == [
+            (0.5, 0.5, 0.0),
+            (0.5, 0.5, 0.0),
+        ]
+
+    def test_points_on_corners_have_angle_of_line_towards_head(self):
+        path = _PathBehindHead([Vec2(0, 0), Vec2(1, 0), Vec2(1, 1), Vec2(2, 2)])
+
+        assert list(path.points_and_angles(0.0, 0.0, 2, 1.0)) == [
+            (1.0, 0.0, 90.0),
+            (1.0, 1.0, 0.0),
+        ]
+
+    def test_point_at_end_of_line_has_angle_of_line(self):
+        path = _PathBehindHead([Vec2(0, 0), Vec2(1, 0), Vec2(2, 0)])
+
+        assert list(path.points_and_angles(0.0, 0.0, 3, 1.0)) == [
+            (1.0, 0.0, 90.0),
+            (2.0, 0.0, 90.0),
+            (2.0, 0.0, 0.0),
+        ]
@@ -65,8 +65,9 @@ def _remove_offset(lines: Iterable[str]):
 
 @dataclass
 class StationCreator:
-    """Creates stations from sets of positions. Adjacent positions are clumped into
-    one large station."""
+    """Creates stations from sets of positions. Positions adjacent along the
+    direction of the stations are clumped into one large station, while parallel
+    rows of positions become separate stations, the platforms of one hub."""
 
     grid: Grid
     east_west: bool
@@ -92,16 +93,16 @@ class StationCreator:
     def _add_to_set_of_positions(self, position: Vec2):
         for set_of_positions in self._sets_of_positions:
             for other_position in set_of_positions:
-                if self._is_adjacent(other_position, position):
+                if self._is_adjacent(other_position, position, self.east_west):
                     set_of_positions.add(position)
                     return
         self._sets_of_positions.append({position})
 
     @staticmethod
-    def _is_adjacent(pos1: Vec2, pos2: Vec2) -> bool:
-        return (pos1.x == pos2.x and abs(pos1.y - pos2.y) == 1) or (
-            pos1.y == pos2.y and abs(pos1.x - pos2.x) == 1
-        )
+    def _is_adjacent(pos1: Vec2, pos2: Vec2, east_west: bool) -> bool:
+        if east_west:
+            return pos1.y == pos2.y and abs(pos1.x - pos2.x) == 1
+        return pos1.x == pos2.x and abs(pos1.y - pos2.y) == 1
 
 
 def create_create_building_method(grid: Grid, building_type: type[Building]):
@@ -64,6 +64,19 @@ class Camera:
         _, _, bottom, top = arcade.get_viewport()
         return top - bottom
 
+    def is_visible(self, x: float, y: float, margin: float = 0.0) -> bool:
+        """Whether a position in world coordinates is in view, or at most margin
+        cells outside of it."""
+        margin_pixels = margin * GRID_BOX_SIZE_PIXELS
+        return (
+            self.left - margin_pixels
+            <= x * GRID_BOX_SIZE_PIXELS
+            <= self.right + margin_pixels
+            and self.bottom - margin_pixels
+            <= y * GRID_BOX_SIZE_PIXELS
+            <= self.top + margin_pixels
+        )
+
     def move(self, position: Vec2):
         dx, dy = position - Vec2(self.left, self.bottom)
         self.left = self.left + dx
@@ -0,0 +1,57 @@
+import math
+from collections import defaultdict
+from typing import Iterator, Sequence
+
+from .train import Train
+
+# Must be at least Train.COLLISION_DISTANCE, so that trains that are close enough
+# to collide are always in the same or neighbouring cells
+CELL_SIZE = 1.0
+
+# Half of the neighbouring cells, so that each pair of cells is only compared once
+_NEIGHBOUR_OFFSETS = ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1))
+
+
+def _cells(train: Train) -> Iterator[tuple[int, int]]:
+    """The cells the train has passed since the previous tick."""
+    for cell_x in range(
+        math.floor(min(train.x, train.previous_x) / CELL_SIZE),
+        math.floor(max(train.x, train.previous_x) / CELL_SIZE) + 1,
+    ):
+        for cell_y in range(
+            math.floor(min(train.y, train.previous_y) / CELL_SIZE),
+            math.floor(max(train.y, train.previous_y) / CELL_SIZE) + 1,
+        ):
+            yield cell_x, cell_y
+
+
+def find_colliding_trains(trains: Sequence[Train]) -> list[tuple[Train, Train]]:
+    """Finds the pairs of trains that collide, in the order of the trains.
+
+    The trains are put in a grid of cells by the positions they have passed since
+    the previous tick, and only trains in the same or neighbouring cells are
+    compared, so the cost grows with the number of trains rather than with the
+    number of pairs of trains."""
+    indices_from_cell: dict[tuple[int, int], list[int]] = defaultdict(list)
+    for index, train in enumerate(trains):
+        for cell in _cells(train):
+            indices_from_cell[cell].append(index)
+
+    # A pair of trains can share several cells
+    close_indices: set[tuple[int, int]] = set()
+    for (cell_x, cell_y), indices in indices_from_cell.items():
+        for dx, dy in _NEIGHBOUR_OFFSETS:
+            neighbour_indices = indices_from_cell.get((cell_x + dx, cell_y + dy))
+            if not neighbour_indices:
+                continue
+            for index1 in indices:
+                for index2 in neighbour_indices:
+                    if index1 < index2:
+                        close_indices.add((index1, index2))
+                    elif index2 < index1:
+                        close_indices.add((index2, index1))
+    return [
+        (trains[index1], trains[index2])
+        for index1, index2 in sorted(close_indices)
+        if trains[index1].is_colliding_with(trains[index2])
+    ]
@@ -1,12 +1,10 @@
-from arcade import color
-
 GRID_WIDTH_CELLS = 20
 GRID_HEIGHT_CELLS = 20
 GRID_WIDTH_PIXELS = 600
 GRID_HEIGHT_PIXELS = 600
 GRID_BOX_SIZE_PIXELS = 30
 GRID_LINE_WIDTH = 1
-GRID_COLOR = color.BLACK
+GRID_COLOR = (0, 0, 0)  # Black
 FINISHED_RAIL_COLOR = [128, 128, 128]  # Gray
 BUILDING_RAIL_COLOR = [128, 128, 128, 128]  # Gray translucent
 BUILDING_ILLEGAL_RAIL_COLOR = [255, 0, 0, 128]  # Red translucent
@@ -18,3 +16,11 @@ WATER_TILES = 20
 PIXEL_OFFSET_PER_CARGO = 4
 CARGO_SIZE = GRID_BOX_SIZE_PIXELS / 3
 SECONDS_BETWEEN_CARGO_CREATION = 2
+
+# The simulation runs in ticks of fixed length, independent of the frame rate
+SIMULATION_TICKS_PER_SECOND = 20
+# If frames are slower than this many ticks, the simulation slows down instead of
+# falling further and further behind
+MAX_SIMULATION_TICKS_PER_FRAME = 5
+# Speeds the simulation can be fast-forwarded to, cycled through in the GUI
+TIME_SCALES = (1, 2, 8, 64)
@@ -0,0 +1,69 @@
+from array import array
+from typing import Protocol
+
+# The entity id of objects that are not in a registry
+NO_ENTITY_ID = 0
+
+_INDEX_BITS = 32
+_INDEX_MASK = (1 << _INDEX_BITS) - 1
+
+
+class Entity(Protocol):
+    @property
+    def entity_id(self) -> int:
+        raise NotImplementedError
+
+
+class EntityRegistry:
+    """Hands out integer ids to the objects in the game world, such as trains,
+    rails, signals, stations and buildings, and finds the objects by id.
+
+    An id is the index of the object in the registry combined with a generation
+    counter of that index, which is increased whenever an object is removed. The
+    index is then reused, but the ids of removed objects never refer to another
+    object, unlike id(), which can be reused by Python as soon as an object is
+    garbage collected. Since the ids are plain integers, they can also be stored
+    and compared without keeping the objects alive."""
+
+    def __init__(self):
+        self._entities: list[Entity | None] = []
+        self._generations = array("L")
+        self._free_indices: list[int] = []
+
+    def add(self, entity: Entity) -> int:
+        """Registers the entity, and sets its entity_id."""
+        if self._free_indices:
+            index = self._free_indices.pop()
+            self._entities[index] = entity
+        else:
+            index = len(self._entities)
+            self._entities.append(entity)
+            self._generations.append(1)
+        entity_id = self._generations[index] << _INDEX_BITS | index
+        # Also works for frozen dataclasses, like Rail and Station
+        object.__setattr__(entity, "entity_id", entity_id)
+        return entity_id
+
+    def remove(self, entity: Entity):
+        """Unregisters the entity, if it is registered. The entity keeps its id,
+        for example for removing it from the Drawer, but it is no longer found by
+        it."""
+        if self.get(entity.entity_id) is not entity:
+            return
+        index = entity.entity_id & _INDEX_MASK
+        self._entities[index] = None
+        self._generations[index] += 1
+        self._free_indices.append(index)
+
+    def get(self, entity_id: int) -> Entity | None:
+        """The entity with the id, or None if it has been removed."""
+        index = entity_id & _INDEX_MASK
+        if (
+            index >= len(self._entities)
+            or self._generations[index] != entity_id >> _INDEX_BITS
+        ):
+            return None
+        return self._entities[index]
+
+    def __len__(self) -> int:
+        return len(self._entities) - len(self._free_indices)
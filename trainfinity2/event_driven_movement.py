@@ -0,0 +1,194 @@
+import math
+from dataclasses import dataclass
+from heapq import heappop, heappush
+
+from .events import Event
+from .train import Train
+
+
+def time_to_travel(
+    distance: float, speed: float, acceleration: float, max_speed: float
+) -> float:
+    """The time it takes to travel a distance when starting at a speed and
+    accelerating up to the max speed."""
+    if distance <= 0:
+        return 0.0
+    time_to_max_speed = max(max_speed - speed, 0.0) / acceleration
+    distance_to_max_speed = (
+        speed * time_to_max_speed + acceleration * time_to_max_speed**2 / 2
+    )
+    if distance >= distance_to_max_speed:
+        return time_to_max_speed + (distance - distance_to_max_speed) / max_speed
+    return (
+        -speed + math.sqrt(speed * speed + 2 * acceleration * distance)
+    ) / acceleration
+
+
+def distance_travelled(
+    time: float, speed: float, acceleration: float, max_speed: float
+) -> float:
+    """The distance travelled in a time when starting at a speed and accelerating up
+    to the max speed."""
+    time_to_max_speed = max(max_speed - speed, 0.0) / acceleration
+    if time <= time_to_max_speed:
+        return speed * time + acceleration * time**2 / 2
+    return (
+        speed * time_to_max_speed
+        + acceleration * time_to_max_speed**2 / 2
+        + max_speed * (time - time_to_max_speed)
+    )
+
+
+@dataclass(frozen=True)
+class _Segment:
+    """A train moving in a straight line from where it was at start_time to its
+    target, which it reaches at arrival_time."""
+
+    start_time: float
+    start_x: float
+    start_y: float
+    start_speed: float
+    distance: float
+    arrival_time: float
+
+    def speed_at(self, time: float) -> float:
+        return min(
+            self.start_speed + Train.ACCELERATION * (time - self.start_time),
+            Train.MAX_SPEED,
+        )
+
+    def fraction_at(self, time: float) -> float:
+        distance = distance_travelled(
+            time - self.start_time,
+            self.start_speed,
+            Train.ACCELERATION,
+            Train.MAX_SPEED,
+        )
+        return min(distance / self.distance, 1.0)
+
+
+class EventDrivenMovement:
+    """Moves trains by events instead of by ticks.
+
+    When a train heads for its next position, the time it arrives there is
+    calculated from its speed and acceleration and put in a priority queue. The
+    train logic, like reserving the next positions and loading cargo, only runs
+    when the time of an event has been reached, and positions are only calculated
+    when asked for, for drawing. The cost of advancing the time thus depends on the
+    number of positions reached, and not on the number of trains.
+
+    Trains waiting at a signal are checked each time the time is advanced, since
+    they are woken up by the signal controller."""
+
+    def __init__(self):
+        self.time = 0.0
+        # Events are (time, sequence number, train). Only the event with the latest
+        # sequence number of a train is valid, which avoids removing events from
+        # the queue when a train is removed.
+        self._queue: list[tuple[float, int, Train]] = []
+        self._sequence_number = 0
+        self._train_from_train_id: dict[int, Train] = {}
+        self._sequence_number_from_train_id: dict[int, int] = {}
+        self._segment_from_train_id: dict[int, _Segment] = {}
+        self._waiting_train_from_train_id: dict[int, Train] = {}
+        self._wait_end_time_from_train_id: dict[int, float] = {}
+        self._end_time = 0.0
+
+    def add(self, train: Train):
+        """Starts moving the train from where it is, which can be between two
+        positions."""
+        self._train_from_train_id[train.entity_id] = train
+        self._schedule_next_event(train)
+
+    def remove(self, train: Train):
+        """Stops moving the train, leaving it where it is at the current time and
+        with the rest of its wait, so that it can be moved by Train.move again."""
+        self._train_from_train_id.pop(train.entity_id, None)
+        self._sequence_number_from_train_id.pop(train.entity_id, None)
+        self._waiting_train_from_train_id.pop(train.entity_id, None)
+        if segment := self._segment_from_train_id.pop(train.entity_id, None):
+            self._place(train, segment)
+        if wait_end_time := self._wait_end_time_from_train_id.pop(
+            train.entity_id, None
+        ):
+            train.wait_timer = wait_end_time - self.time
+
+    def advance(self, delta_time: float) -> list[Event]:
+        """Advances the time, and runs the train logic of all events until then."""
+        self._end_time = self.time + delta_time
+        for train_id, train in list(self._waiting_train_from_train_id.items()):
+            if not train.is_waiting_for_signal:
+                del self._waiting_train_from_train_id[train_id]
+                self._schedule(train, self.time)
+
+        events: list[Event] = []
+        queue = self._queue
+        while queue and queue[0][0] < self._end_time:
+            time, sequence_number, train = heappop(queue)
+            if (
+                self._sequence_number_from_train_id.get(train.entity_id)
+                != sequence_number
+            ):
+                continue
+            self.time = time
+            events.extend(self._on_event(train))
+        self.time = self._end_time
+        return events
+
+    def update_positions(self):
+        """Moves all moving trains to where they are at the current time."""
+        for train_id, segment in self._segment_from_train_id.items():
+            self._place(self._train_from_train_id[train_id], segment)
+
+    def _place(self, train: Train, segment: _Segment):
+        fraction = segment.fraction_at(self.time)
+        train.speed = segment.speed_at(self.time)
+        train.set_position(
+            segment.start_x + (train.target_x - segment.start_x) * fraction,
+            segment.start_y + (train.target_y - segment.start_y) * fraction,
+        )
+
+    def _on_event(self, train: Train) -> list[Event]:
+        self._wait_end_time_from_train_id.pop(train.entity_id, None)
+        if segment := self._segment_from_train_id.pop(train.entity_id, None):
+            train.speed = segment.speed_at(self.time)
+            train.set_position(train.target_x, train.target_y)
+        events = train.on_movement_event()
+        self._schedule_next_event(train)
+        return events
+
+    def _schedule_next_event(self, train: Train):
+        if train.is_waiting_for_signal:
+            self._sequence_number_from_train_id.pop(train.entity_id, None)
+            self._waiting_train_from_train_id[train.entity_id] = train
+            return
+        if train.wait_timer > 0:
+            wait_end_time = self.time + train.wait_timer
+            self._wait_end_time_from_train_id[train.entity_id] = wait_end_time
+            self._schedule(train, wait_end_time)
+            train.wait_timer = 0
+            return
+        distance = math.hypot(train.target_x - train.x, train.target_y - train.y)
+        if distance == 0:
+            # The train has to do something else before it moves, like reversing at
+            # a station. Do it when the time is advanced the next time, like a tick.
+            self._schedule(train, self._end_time)
+            return
+        segment = _Segment(
+            start_time=self.time,
+            start_x=train.x,
+            start_y=train.y,
+            start_speed=train.speed,
+            distance=distance,
+            arrival_time=self.time
+            + time_to_travel(
+                distance, train.speed, Train.ACCELERATION, Train.MAX_SPEED
+            ),
+        )
+        self._segment_from_train_id[train.entity_id] = segment
+        self._schedule(train, segment.arrival_time)
+
+    def _schedule(self, train: Train, time: float):
+        self._sequence_number += 1
+        self._sequence_number_from_train_id[train.entity_id] = self._sequence_number
+        heappush(self._queue, (time, self._sequence_number, train))
@@ -1,10 +1,10 @@
 from collections import deque
+from contextlib import nullcontext
 from dataclasses import dataclass
-from itertools import combinations
+from typing import Sequence
 
 import arcade
 from pyglet.math import Vec2
-from trainfinity2.cargo_values import CARGO_VALUES
 
 from trainfinity2.events import Event
 
@@ -12,15 +12,16 @@ from .camera import Camera
 from .constants import (
     GRID_HEIGHT_PIXELS,
     GRID_WIDTH_PIXELS,
-    SECONDS_BETWEEN_CARGO_CREATION,
+    MAX_SIMULATION_TICKS_PER_FRAME,
+    SIMULATION_TICKS_PER_SECOND,
+    TIME_SCALES,
 )
 from .graphics.drawer import Drawer
-from .grid import (
-    Grid,
-)
 from .gui import Gui, Mode
-from .model import CargoSoldEvent, Player, Station
-from .signal_controller import SignalController
+from .model import Station
+from .route_finder import RouteFinderStats, collect_route_finder_stats
+from .signal_controller import DeadlockEvent
+from .sim import LevelUpEvent, Simulation
 from .terrain import Terrain
 from .train import Train
 from .box import Box
@@ -28,6 +29,9 @@ from .box import Box
 MAX_PIXELS_BETWEEN_CLICK_AND_RELEASE_FOR_CLICK = 5
 # Min zoom = 1/MAX_CAMERA_SCALE, i.e. 25%
 MAX_CAMERA_SCALE = 4
+# Trains this many cells outside the view are still moved every tick, since the
+# positions of trains moved cell by cell are only updated when they reach a cell
+OFF_SCREEN_MARGIN_CELLS = 2
 # Max zoom = 1/MIN_CAMERA_SCALE, i.e. 200%
 MIN_CAMERA_SCALE = 0.5
 
@@ -69,8 +73,18 @@ class Game:
         self.score_last_second = 0
         self.score_increase_per_second_last_minute: deque[int] = deque(maxlen=60)
         self.seconds_since_last_gui_figures_update = 0.0
-
-    def setup(self, terrain: Terrain):
+        # Whether route_finder_stats_last_frame and the stats of each train are
+        # updated. Off unless profiling, since measuring slows down every search.
+        self.measure_route_searches = False
+        self.route_finder_stats_last_frame = RouteFinderStats()
+        self.ticks_per_second = SIMULATION_TICKS_PER_SECOND
+        # Simulated seconds per real second
+        self.time_scale = 1
+        self._time_since_last_tick = 0.0
+
+    def setup(self, terrain: Terrain, path_based: bool = False):
+        """Creates the world. With path_based, trains with disjoint paths through a
+        signal block can be in it at the same time."""
         self.camera = Camera()
         self.camera_position_when_mouse2_pressed = self.camera.position
 
@@ -83,22 +97,24 @@ class Game:
             Box("DESTROY", self._set_mode, [Mode.DESTROY], Mode.DESTROY),
             Box("+WAGON", self._create_wagon_for_selected_train, []),
             Box("DESTROY\nTRAIN", self._destroy_selected_train, []),
+            Box("SPEED", self._cycle_time_scale, []),
         ]
 
         self.gui_camera = Camera()
         self.gui = Gui(self.gui_camera, boxes)
 
-        self.trains: list[Train] = []
+        # Whether trains outside the view are moved by the simulation's off-screen
+        # movement
+        self.simplify_off_screen_trains = True
 
-        self.signal_controller = SignalController()
-        self.grid = Grid(terrain, self.signal_controller)
+        self.simulation = Simulation(terrain, self.gui, path_based)
+        self.signal_controller = self.simulation.signal_controller
+        self.grid = self.simulation.grid
+        self.trains = self.simulation.trains
+        self.player = self.simulation.player
         self.drawer = Drawer()
-
-        self.player = Player(self.gui, self.level_up)
-        self.player.level_up()
-        self.player.update_score_in_gui()
-
-        self.cargo_counter = 0.0
+        self.simulation.observers.append(self._on_simulation_events)
+        self.simulation.start()
 
         self.drawer.create_grid(self.grid)
         self.drawer.create_terrain(
@@ -107,41 +123,87 @@ class Game:
 
         self._train_placer = _TrainPlacer(self.drawer)
 
+    def use_event_driven_movement(self):
+        for train in self.trains:
+            self._set_off_screen(train, False)
+        self.simulation.use_event_driven_movement()
+
+    def _on_simulation_events(self, events: Sequence[Event]):
+        self.drawer.handle_events(events)
+        for event in events:
+            match event:
+                case DeadlockEvent(reserver_ids):
+                    self.gui.toast(f"Deadlock between {len(reserver_ids)} trains")
+                case LevelUpEvent():
+                    self.drawer.create_grid(self.grid)
+
     def _set_mode(self, mode: Mode):
         self.gui.mode = mode
         for train in self.trains:
             train.selected = False
 
-    def try_create_cargo_in_all_buildings(self):
-        for building in self.grid.buildings.values():
-            self.drawer.handle_events(building.try_create_cargo())
+    @property
+    def tick_interpolation(self) -> float:
+        """How far the time is between the last tick and the next, from 0 to 1, for
+        drawing trains between their positions at the last two ticks."""
+        return min(self._time_since_last_tick * self.ticks_per_second, 1.0)
 
     def on_update(self, delta_time):
-        self.cargo_counter += delta_time
-        if self.cargo_counter > SECONDS_BETWEEN_CARGO_CREATION:
-            self.try_create_cargo_in_all_buildings()
-            self.cargo_counter = 0.0
+        """Called every frame. Runs as many simulation ticks as the time since the
+        last frame covers, so that the simulation does not depend on the frame
+        rate. When fast-forwarding, the simulated time is split into more ticks of
+        the same length, so that trains still reserve every position they pass."""
+        tick_length = 1 / self.ticks_per_second
+        self._time_since_last_tick += delta_time * self.time_scale
+        if self.simulation.event_driven_movement is None:
+            self._update_off_screen_trains()
+        self.route_finder_stats_last_frame = RouteFinderStats()
+        with (
+            collect_route_finder_stats(self.route_finder_stats_last_frame)
+            if self.measure_route_searches
+            else nullcontext()
+        ):
+            for _ in range(MAX_SIMULATION_TICKS_PER_FRAME * self.time_scale):
+                # Allow for rounding errors when adding up frame times
+                if self._time_since_last_tick < tick_length - 1e-9:
+                    break
+                self._time_since_last_tick = max(
+                    self._time_since_last_tick - tick_length, 0.0
+                )
+                self.tick(tick_length)
+            else:
+                self._time_since_last_tick = min(
+                    self._time_since_last_tick, tick_length
+                )
+        self.simulation.update_positions()
         self._update_gui_figures(delta_time)
-
-        for train in self.trains:
-            events = train.move(delta_time)
-            for event in events:
-                match event:
-                    case CargoSoldEvent(type, amount):
-                        self.player.money += CARGO_VALUES[type] * amount
-            self.drawer.handle_events(events)
-
-        for train1, train2 in combinations(self.trains, 2):
-            if train1.is_colliding_with(train2):
-                self._destroy_train(train1)
-                self._destroy_train(train2)
         self.drawer.update()
         self.gui.on_update(delta_time)
 
-    def _destroy_train(self, train: Train):
-        train.destroy()
-        self.drawer.destroy_train(train)
-        self.trains.remove(train)
+    def tick(self, tick_length: float):
+        """Advances the simulation by one tick."""
+        self.simulation.tick(tick_length)
+
+    def _update_off_screen_trains(self):
+        for train in self.trains:
+            self._set_off_screen(
+                train,
+                self.simplify_off_screen_trains
+                and not self.camera.is_visible(
+                    train.x, train.y, OFF_SCREEN_MARGIN_CELLS
+                ),
+            )
+
+    def _set_off_screen(self, train: Train, off_screen: bool):
+        if off_screen != self.simulation.is_off_screen(train):
+            self.simulation.set_off_screen(train, off_screen)
+            self.drawer.set_train_visible(train, not off_screen)
+
+    def _cycle_time_scale(self):
+        self.time_scale = TIME_SCALES[
+            (TIME_SCALES.index(self.time_scale) + 1) % len(TIME_SCALES)
+        ]
+        self.gui.toast(f"Speed {self.time_scale}x")
 
     def _update_gui_figures(self, delta_time):
         self.frame_count += 1
@@ -161,7 +223,7 @@ class Game:
             self.seconds_since_last_gui_figures_update -= 1
 
     def on_draw(self):
-        self.drawer.draw()
+        self.drawer.draw(self.tick_interpolation)
 
         # Draw GUI here even though there are many draw calls, since the colors of the boxes
         # are dynamic
@@ -238,14 +300,7 @@ class Game:
             self.drawer.handle_events(self.grid.remove_rail(Vec2(world_x, world_y)))
 
     def _create_train(self, station1: Station, station2: Station):
-        train = Train(
-            station1.positions[0],
-            station2.positions[0],
-            self.grid,
-            self.signal_controller,
-        )
-        self.trains.append(train)
-        self.drawer.create_train(train)
+        train = self.simulation.create_train(station1, station2)
         self.gui.mode = Mode.SELECT
         train.selected = True
         return train
@@ -256,7 +311,7 @@ class Game:
 
     def _destroy_selected_train(self):
         if train := self._selected_train:
-            self._destroy_train(train)
+            self.simulation.destroy_train(train)
 
     def _create_wagon_for_selected_train(self):
         if train := self._selected_train:
@@ -352,7 +407,3 @@ class Game:
         self.gui_camera.resize(width, height)
         self.camera.set_viewport()
         self.gui.refresh_text()
-
-    def level_up(self, level: int):
-        self.drawer.handle_events(self.grid.level_up(level))
-        self.drawer.create_grid(self.grid)
@@ -44,7 +44,10 @@ from ..model import (
     SteelWorks,
     Workshop,
 )
+from ..entities import Entity
 from ..events import CreateEvent, DestroyEvent, Event
+from ..signal_controller import DeadlockEvent
+from ..sim import LevelUpEvent
 from ..train import Train
 
 
@@ -83,10 +86,10 @@ class Drawer:
         # Needed to easily remove sprites and shapes
         self.cargo_shapes_from_position = defaultdict(list)
 
-        self._sprites_from_object_id = defaultdict(list)
-        self._shapes_from_object_id = defaultdict(list)
-        self._rail_shapes_from_object_id = defaultdict(list)
-        self._signal_shapes_from_object_id = defaultdict(list)
+        self._sprites_from_entity_id = defaultdict(list)
+        self._shapes_from_entity_id = defaultdict(list)
+        self._rail_shapes_from_entity_id = defaultdict(list)
+        self._signal_shapes_from_entity_id = defaultdict(list)
 
         self._rail_shape_list = _ShapeElementList()
         self._signal_shape_list = _ShapeElementList()
@@ -124,6 +127,8 @@ class Drawer:
                     self._create_rail(rail)
                 case CreateEvent(Signal() as signal):
                     self._update_signal(signal)
+                case CreateEvent(Train() as train):
+                    self.create_train(train)
                 case StationBeingBuiltEvent():
                     self._show_station_being_built(
                         event.station, event.illegal_positions
@@ -133,31 +138,39 @@ class Drawer:
                 case SignalsBeingBuiltEvent():
                     self._show_signals_being_built(event.signals)
                 case CargoAddedEvent():
-                    self._add_cargo(event.position, event.type)
+                    self._add_cargo(event.position, event.type, event.amount)
                 case CargoRemovedEvent():
                     self._remove_cargo(event.position, event.amount)
+                case DestroyEvent(Train() as train):
+                    self.destroy_train(train)
                 case DestroyEvent():
                     self._remove(event.object)
                 case CargoSoldEvent():
                     # Do nothing at this point. In the future, perhaps
                     # create some floating text or something
                     pass
+                case DeadlockEvent():
+                    # Shown as a toast by the game
+                    pass
+                case LevelUpEvent():
+                    # The game redraws the enlarged grid
+                    pass
                 case _:
                     raise ValueError(f"Event not being handled: {event}")
 
     def _remove(self, object: Any):
-        for sprite in self._sprites_from_object_id[id(object)]:
+        for sprite in self._sprites_from_entity_id[object.entity_id]:
             self._sprite_list.remove(sprite)
-        del self._sprites_from_object_id[id(object)]
-        for shape in self._shapes_from_object_id[id(object)]:
+        del self._sprites_from_entity_id[object.entity_id]
+        for shape in self._shapes_from_entity_id[object.entity_id]:
             self._shape_list.remove(shape)
-        del self._shapes_from_object_id[id(object)]
-        for rail_shape in self._rail_shapes_from_object_id[id(object)]:
+        del self._shapes_from_entity_id[object.entity_id]
+        for rail_shape in self._rail_shapes_from_entity_id[object.entity_id]:
             self._rail_shape_list.remove(rail_shape)
-        del self._rail_shapes_from_object_id[id(object)]
-        for signal_shape in self._signal_shapes_from_object_id[id(object)]:
+        del self._rail_shapes_from_entity_id[object.entity_id]
+        for signal_shape in self._signal_shapes_from_entity_id[object.entity_id]:
             self._signal_shape_list.remove(signal_shape)
-        del self._signal_shapes_from_object_id[id(object)]
+        del self._signal_shapes_from_entity_id[object.entity_id]
         # Just in case it was rails that was destroyed, hide the red outline
         self.show_rails_to_be_destroyed(set())
 
@@ -300,21 +313,21 @@ class Drawer:
         self._remove(signal)
         self._add_signal_shape(self._create_signal_shape(signal), signal)
 
-    def _add_sprite(self, sprite: arcade.Sprite, object: Any):
+    def _add_sprite(self, sprite: arcade.Sprite, object: Entity):
         self._sprite_list.append(sprite)
-        self._sprites_from_object_id[id(object)].append(sprite)
+        self._sprites_from_entity_id[object.entity_id].append(sprite)
 
-    def _add_shape(self, shape: arcade.Shape, object: Any):
+    def _add_shape(self, shape: arcade.Shape, object: Entity):
         self._shape_list.append(shape)
-        self._shapes_from_object_id[id(object)].append(shape)
+        self._shapes_from_entity_id[object.entity_id].append(shape)
 
-    def _add_rail_shape(self, shape: arcade.Shape, object: Any):
+    def _add_rail_shape(self, shape: arcade.Shape, object: Entity):
         self._rail_shape_list.append(shape)
-        self._rail_shapes_from_object_id[id(object)].append(shape)
+        self._rail_shapes_from_entity_id[object.entity_id].append(shape)
 
-    def _add_signal_shape(self, shape: arcade.Shape, object: Any):
+    def _add_signal_shape(self, shape: arcade.Shape, object: Entity):
         self._signal_shape_list.append(shape)
-        self._signal_shapes_from_object_id[id(object)].append(shape)
+        self._signal_shapes_from_entity_id[object.entity_id].append(shape)
 
     def create_terrain(
         self,
@@ -345,14 +358,19 @@ class Drawer:
     def destroy_train(self, train: Train):
         self._train_drawer.remove(train)
 
-    def _add_cargo(self, position: Vec2, cargo_type: CargoType):
-        x, y = position.x * GRID_BOX_SIZE_PIXELS, position.y * GRID_BOX_SIZE_PIXELS
-        x += len(self.cargo_shapes_from_position[position]) * int(
-            PIXEL_OFFSET_PER_CARGO / 2
-        )
-        for shape in get_cargo_shape(x, y, cargo_type):
-            self.cargo_shapes_from_position[position].append(shape)
-            self.cargo_shape_element_list.append(shape)
+    def set_train_visible(self, train: Train, visible: bool):
+        self._train_drawer.set_visible(train, visible)
+
+    def _add_cargo(self, position: Vec2, cargo_type: CargoType, amount: int = 1):
+        for _ in range(amount):
+            x = position.x * GRID_BOX_SIZE_PIXELS
+            y = position.y * GRID_BOX_SIZE_PIXELS
+            x += len(self.cargo_shapes_from_position[position]) * int(
+                PIXEL_OFFSET_PER_CARGO / 2
+            )
+            for shape in get_cargo_shape(x, y, cargo_type):
+                self.cargo_shapes_from_position[position].append(shape)
+                self.cargo_shape_element_list.append(shape)
 
     def _remove_cargo(self, position: Vec2, amount: int):
         for _ in range(amount):
@@ -425,7 +443,7 @@ class Drawer:
                     self.rail_to_be_destroyed_shape_list.append(shape)
         self._previous_rails_to_be_marked_as_to_be_destroyed = rails
 
-    def draw(self):
+    def draw(self, tick_interpolation: float = 1.0):
         self._grid_shape_list.draw()
         self._shape_list.draw()
         self._sprite_list.draw()
@@ -441,7 +459,7 @@ class Drawer:
 
         self.highlight_shape_element_list.draw()
 
-        self._train_drawer.draw()
+        self._train_drawer.draw(tick_interpolation)
 
     def update(self):
         self._train_drawer.update()
@@ -33,10 +33,15 @@ def _make_smoke_emitter():
     )
 
 
+def _interpolate(previous: float, current: float, fraction: float) -> float:
+    return previous + (current - previous) * fraction
+
+
 @dataclass
 class SmokingTrain:
     train: Train
     smoke_emitter: Emitter
+    visible: bool = True
 
 
 class TrainDrawer:
@@ -55,25 +60,40 @@ class TrainDrawer:
             if smoking_train.train != train
         ]
 
-    def draw(self):
+    def set_visible(self, train: Train, visible: bool):
+        """Trains that are not visible are not drawn, and their smoke is not
+        updated."""
+        for smoking_train in self._smoking_trains:
+            if smoking_train.train is train:
+                smoking_train.visible = visible
+
+    def draw(self, tick_interpolation: float = 1.0):
+        """Draws the trains and wagons `tick_interpolation` of the way from their
+        positions at the previous simulation tick to the ones at the last tick."""
         # TODO: Create a shapelist per train that we can move instead
         for train in self._smoking_trains:
-            self._draw_train(train.train)
+            if not train.visible:
+                continue
+            self._draw_train(train.train, tick_interpolation)
             for wagon in train.train.wagons:
-                self._draw_wagon(wagon)
+                self._draw_wagon(wagon, tick_interpolation)
             train.smoke_emitter.draw()
 
     def update(self):
         for train in self._smoking_trains:
+            if not train.visible:
+                continue
             x = train.train.x * GRID_BOX_SIZE_PIXELS + GRID_BOX_SIZE_PIXELS / 2
             y = train.train.y * GRID_BOX_SIZE_PIXELS + GRID_BOX_SIZE_PIXELS / 2
             train.smoke_emitter.center_x = x
             train.smoke_emitter.center_y = y
             train.smoke_emitter.update()
 
-    def _draw_train(self, train: Train):
-        x = train.x * GRID_BOX_SIZE_PIXELS + GRID_BOX_SIZE_PIXELS / 2
-        y = train.y * GRID_BOX_SIZE_PIXELS + GRID_BOX_SIZE_PIXELS / 2
+    def _draw_train(self, train: Train, tick_interpolation: float):
+        train_x = _interpolate(train.previous_x, train.x, tick_interpolation)
+        train_y = _interpolate(train.previous_y, train.y, tick_interpolation)
+        x = train_x * GRID_BOX_SIZE_PIXELS + GRID_BOX_SIZE_PIXELS / 2
+        y = train_y * GRID_BOX_SIZE_PIXELS + GRID_BOX_SIZE_PIXELS / 2
         arcade.draw_rectangle_filled(
             x,
             y,
@@ -104,9 +124,13 @@ class TrainDrawer:
                 ]
                 arcade.draw_lines(positions, color=HIGHLIGHT_COLOR, line_width=4)
 
-    def _draw_wagon(self, wagon: Wagon):
-        x = (wagon.x + 1 / 2) * GRID_BOX_SIZE_PIXELS
-        y = (wagon.y + 1 / 2) * GRID_BOX_SIZE_PIXELS
+    def _draw_wagon(self, wagon: Wagon, tick_interpolation: float):
+        x = (
+            _interpolate(wagon.previous_x, wagon.x, tick_interpolation) + 1 / 2
+        ) * GRID_BOX_SIZE_PIXELS
+        y = (
+            _interpolate(wagon.previous_y, wagon.y, tick_interpolation) + 1 / 2
+        ) * GRID_BOX_SIZE_PIXELS
         arcade.draw_rectangle_filled(
             x,
             y,
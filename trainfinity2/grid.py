@@ -11,7 +11,7 @@ from trainfinity2.constants import GRID_HEIGHT_CELLS, GRID_WIDTH_CELLS
 from trainfinity2.station_builder import StationBuilder
 from trainfinity2.util import positions_between
 
-from .gui import Mode
+from .mode import Mode
 from .model import (
     Building,
     CargoType,
@@ -27,11 +27,16 @@ from .model import (
     Water,
     Workshop,
 )
+from .entities import Entity, EntityRegistry
 from .events import CreateEvent, DestroyEvent, Event
+from .protocols import RouteUser
 from .signal_controller import SignalController
 from .terrain import Terrain
 
-from .route_finder import find_route
+from .route_finder import DistancesToStation, find_route, record_cache_hit
+
+# Distances are cached to at most this many stations, least recently used dropped first
+MAX_CACHED_DISTANCES_TO_STATIONS = 256
 
 
 @dataclass
@@ -67,6 +72,8 @@ class Grid:
     def __init__(self, terrain: Terrain, signal_controller: SignalController) -> None:
         super().__init__()
         self._signal_controller = signal_controller
+        # Trains, rails, signals, stations and buildings
+        self.entities = EntityRegistry()
 
         self.water: dict[Vec2, Water] = {}
         self.buildings: dict[Vec2, Building] = {}
@@ -74,6 +81,14 @@ class Grid:
         self.signals: dict[tuple[Vec2, Rail], Signal] = {}
         self.rails_being_built: set[Rail] = set()
         self.rails: set[Rail] = set()
+        self._rails_from_position: dict[Vec2, set[Rail]] = defaultdict(set)
+        # Ordered from least to most recently used
+        self._distances_to_station_cache: dict[Station, DistancesToStation] = {}
+        # Which rails each route user (train) plans to use, and the reverse, so that
+        # only affected trains have to replan when rail is removed or created.
+        self._route_user_from_id: dict[int, RouteUser] = {}
+        self._rails_from_route_user_id: dict[int, list[Rail]] = {}
+        self._route_user_ids_from_rail: dict[Rail, set[int]] = defaultdict(set)
 
         self.left = 0
         self.bottom = 0
@@ -101,6 +116,7 @@ class Grid:
                 return position
 
     def create_building(self, building: Building):
+        self.entities.add(building)
         self.buildings[building.position] = building
         return CreateEvent(building)
 
@@ -129,12 +145,54 @@ class Grid:
             station2,
         )
 
+    def distances_to_station(self, target_station: Station) -> DistancesToStation:
+        """The distances to a station from everywhere that leads there. Cached until
+        rail is created or removed, since signals do not affect which routes exist."""
+        cache = self._distances_to_station_cache
+        distances = cache.pop(target_station, None)
+        record_cache_hit(distances is not None)
+        if distances is None:
+            if len(cache) >= MAX_CACHED_DISTANCES_TO_STATIONS:
+                del cache[next(iter(cache))]
+            distances = DistancesToStation(
+                self.possible_next_rails_ignore_red_lights, target_station
+            )
+        cache[target_station] = distances
+        return distances
+
+    def set_route(self, route_user: RouteUser, rails: list[Rail] | None):
+        """Called by trains whenever they adopt a new route."""
+        self.remove_route(route_user)
+        if rails:
+            self._route_user_from_id[route_user.entity_id] = route_user
+            self._rails_from_route_user_id[route_user.entity_id] = rails
+            for rail in rails:
+                self._route_user_ids_from_rail[rail].add(route_user.entity_id)
+
+    def remove_route(self, route_user: RouteUser):
+        self._route_user_from_id.pop(route_user.entity_id, None)
+        for rail in self._rails_from_route_user_id.pop(route_user.entity_id, []):
+            self._route_user_ids_from_rail[rail].discard(route_user.entity_id)
+            if not self._route_user_ids_from_rail[rail]:
+                del self._route_user_ids_from_rail[rail]
+
+    def route_users(self, rails: Iterable[Rail]) -> list[RouteUser]:
+        """The route users (trains) whose planned route uses any of the rails."""
+        ids = set().union(
+            *(self._route_user_ids_from_rail.get(rail, set()) for rail in rails)
+        )
+        return [self._route_user_from_id[id_] for id_ in ids]
+
+    def _replan_routes(self, rails: Iterable[Rail]):
+        for route_user in self.route_users(rails):
+            route_user.replan_route()
+
     @property
     def stations(self) -> set[Station]:
         return set(self.station_from_position.values())
 
     def rails_at_position(self, position: Vec2) -> set[Rail]:
-        return {rail for rail in self.rails if position in rail.positions}
+        return set(self._rails_from_position.get(position, ()))
 
     def possible_next_rails_ignore_red_lights(
         self, position: Vec2, previous_rail: Rail | None
@@ -168,7 +226,8 @@ class Grid:
         return {rail.to_illegal() if self._is_illegal(rail) else rail for rail in rails}
 
     def _illegal_station_positions(self, station: Station) -> set[Vec2]:
-        if not self.adjacent_buildings(station.positions):
+        # Platforms further away from the buildings are fine
+        if not self.buildings_at_station(station):
             return set(station.positions)
 
         overlapping_positions_with_rail_in_wrong_direction = {
@@ -268,35 +327,63 @@ class Grid:
 
     def remove_rail(self, position: Vec2) -> list[Event]:
         events: list[Event] = []
-        for rail in self.rails_at_position(position):
-            events.append(DestroyEvent(rail))
-            keys = [key for key, signal in self.signals.items() if signal.rail == rail]
-            for key in keys:
-                events.append(DestroyEvent(self.signals[key]))
-                del self.signals[key]
+        self._distances_to_station_cache.clear()
+        removed_rails = self.rails_at_position(position)
+        removed_signals: list[Signal] = []
+        for rail in removed_rails:
+            events.append(self._destroy(rail))
+            for rail_position in rail.positions:
+                if signal := self.signals.pop((rail_position, rail), None):
+                    events.append(self._destroy(signal))
+                    removed_signals.append(signal)
             self.rails.remove(rail)
+            for rail_position in rail.positions:
+                self._rails_from_position[rail_position].discard(rail)
+                if not self._rails_from_position[rail_position]:
+                    del self._rails_from_position[rail_position]
             for station in set(self.station_from_position.values()):
                 if rail in station.internal_and_external_rail:
-                    events.append(DestroyEvent(station))
+                    events.append(self._destroy(station))
                     for position in station.positions:
                         del self.station_from_position[position]
 
         events.extend(
-            self._signal_controller.create_signal_blocks(
-                self, list(self.signals.values())
+            self._signal_controller.update_signal_blocks(
+                self,
+                {position for rail in removed_rails for position in rail.positions},
+                removed_signals=removed_signals,
             )
         )
+        self._replan_routes(removed_rails)
         return events
 
+    def _destroy(self, entity: Entity) -> DestroyEvent:
+        self.entities.remove(entity)
+        return DestroyEvent(entity)
+
     def create_rail(self, rails: set[Rail]) -> list[Event]:
-        self.rails.update(rails)
-        events = self._signal_controller.create_signal_blocks(
-            self, list(self.signals.values())
+        # Rails equal to rails already built are not added, since the rails
+        # already built have the entity ids that the Drawer knows them by
+        new_rails = {rail for rail in rails if rail not in self.rails}
+        self.rails.update(new_rails)
+        for rail in new_rails:
+            self.entities.add(rail)
+            for position in rail.positions:
+                self._rails_from_position[position].add(rail)
+        self._distances_to_station_cache.clear()
+        # New rail can only give a shorter route to trains passing next to it
+        self._replan_routes(
+            {
+                adjacent_rail
+                for rail in rails
+                for position in rail.positions
+                for adjacent_rail in self.rails_at_position(position)
+            }
+        )
+        events = self._signal_controller.update_signal_blocks(
+            self, {position for rail in new_rails for position in rail.positions}
         )
-        # Objects might change id when they are put into a set. Since Drawer uses
-        # the object id as key, we need to first put the object in the set and then
-        # use the object from the set.
-        events.extend(CreateEvent(rail) for rail in self.rails if rail in rails)
+        events.extend(CreateEvent(rail) for rail in new_rails)
         return events
 
     def release_mouse_button(self, mode: Mode) -> list[Event]:
@@ -310,7 +397,7 @@ class Grid:
                 and not (self._illegal_station_positions(self.station_being_built))
             ):
                 if self.station_being_replaced:
-                    events.append(DestroyEvent(self.station_being_replaced))
+                    events.append(self._destroy(self.station_being_replaced))
                 events.extend(self.create_rail(self.rails_being_built))
                 events.append(self.create_station(self.station_being_built))
 
@@ -339,12 +426,42 @@ class Grid:
             if self._is_adjacent(position, building.position)
         ]
 
+    def platforms(self, station: Station) -> list[Station]:
+        """The station, and the stations parallel to it that are next to it, directly
+        or through other such stations. Together they are the platforms of one
+        station, any of which a train can stop at."""
+        platforms = [station]
+        dx, dy = (0, 1) if station.east_west else (1, 0)
+        # The list grows while it is iterated over, until no more platforms are found
+        for platform in platforms:
+            for x, y in platform.positions:
+                for position in (Vec2(x - dx, y - dy), Vec2(x + dx, y + dy)):
+                    neighbour = self.station_from_position.get(position)
+                    if (
+                        neighbour
+                        and neighbour.east_west == station.east_west
+                        and neighbour not in platforms
+                    ):
+                        platforms.append(neighbour)
+        return platforms
+
+    def buildings_at_station(self, station: Station) -> list[Building]:
+        """The buildings next to any of the platforms of the station."""
+        return self.adjacent_buildings(
+            [
+                position
+                for platform in self.platforms(station)
+                for position in platform.positions
+            ]
+        )
+
     def create_station(self, station: Station) -> CreateEvent:
         """Creates a station in a location. Must be next to a mine or a factory, or it raises AssertionError.
 
         East-west if east_west == True, otherwise north-south."""
         # mine_or_factory = self._adjacent_mine_or_factory(station.position)
         # assert mine_or_factory
+        self.entities.add(station)
         for position in station.positions:
             self.station_from_position[position] = station
         return CreateEvent(station)
@@ -385,7 +502,7 @@ class Grid:
         ]
 
     def accepted_cargo(self, station: Station) -> set[CargoType]:
-        buildings = self.adjacent_buildings(station.positions)
+        buildings = self.buildings_at_station(station)
         return set().union(*(building.accepts for building in buildings))
 
     def _closest_rail(self, x, y) -> Rail | None:
@@ -416,16 +533,29 @@ class Grid:
     def toggle_signals_at_grid_position(self, x: float, y: float) -> Sequence[Event]:
         events: list[Event] = []
         if rail := self._closest_rail(x, y):
+            added_signals: list[Signal] = []
+            removed_signals: list[Signal] = []
             for position in rail.positions:
                 signal = self.signals.get((position, rail))
                 if signal:
                     del self.signals[(position, rail)]
-                    events.append(DestroyEvent(signal))
+                    events.append(self._destroy(signal))
+                    removed_signals.append(signal)
                 else:
                     signal = Signal(position, rail)
+                    self.entities.add(signal)
                     self.signals[(position, rail)] = signal
                     events.append(CreateEvent(signal))
-        self._signal_controller.create_signal_blocks(self, list(self.signals.values()))
+                    added_signals.append(signal)
+            events.extend(
+                self._signal_controller.update_signal_blocks(
+                    self,
+                    rail.positions,
+                    added_signals,
+                    removed_signals,
+                    in_background=True,
+                )
+            )
         return events
 
     def show_signal_outline(
@@ -9,8 +9,9 @@ from pyglet.math import Vec2
 
 from itertools import pairwise
 
-from .gui import Gui
+from .entities import NO_ENTITY_ID
 from .events import CreateEvent, Event
+from .protocols import ScoreBoard
 
 
 @dataclass(frozen=True)
@@ -20,6 +21,7 @@ class Rail:
     x2: int
     y2: int
     legal: bool = True  # Whether a rail tile that is currently being built can be built
+    entity_id: int = field(default=NO_ENTITY_ID, compare=False, repr=False)
 
     def __eq__(self, other: object):
         if isinstance(other, Rail):
@@ -60,11 +62,17 @@ class CargoType(Enum):
     LOGS = auto()
     PLANKS = auto()
 
+    @property
+    def id(self) -> int:
+        """Index of the cargo type in arrays with one element per cargo type"""
+        return self.value - 1
+
 
 @dataclass(frozen=True)
 class CargoAddedEvent(Event):
     position: Vec2
     type: CargoType
+    amount: int = 1
 
 
 @dataclass(frozen=True)
@@ -90,6 +98,7 @@ class Building(ABC):
     position: Vec2
     cargo_count: dict[CargoType, int] = field(default_factory=lambda: defaultdict(int))
     recipe: Recipe = field(init=False)
+    entity_id: int = field(default=NO_ENTITY_ID, compare=False, repr=False)
 
     @property
     def accepts(self) -> set[CargoType]:
@@ -121,7 +130,7 @@ class Building(ABC):
 
     def add_cargo(self, type: CargoType, amount: int) -> list[Event]:
         self.cargo_count[type] += amount
-        return [CargoAddedEvent(self.position, type)]
+        return [CargoAddedEvent(self.position, type, amount)]
 
 
 @dataclass
@@ -178,6 +187,7 @@ class Sawmill(Building):
 class Station:
     positions: tuple[Vec2, ...]
     east_west: bool = True
+    entity_id: int = field(default=NO_ENTITY_ID, compare=False, repr=False)
 
     @functools.cached_property
     def positions_before_and_after(self) -> tuple[Vec2, Vec2]:
@@ -229,7 +239,7 @@ def get_level_scores() -> list[int]:
 
 @dataclass
 class Player:
-    gui: Gui
+    score_board: ScoreBoard
     level_up_callback: Callable[[int], None]
     _score: int = 0
     _level = 0
@@ -248,14 +258,16 @@ class Player:
         self._score = value
         while self._score >= self.LEVELS[self._level + 1]:
             self.level_up()
-        self.update_score_in_gui()
+        self.update_score_board()
 
     def level_up(self):
         self._level += 1
         self.level_up_callback(self._level)
 
-    def update_score_in_gui(self):
-        self.gui.update_score(self._score, self._level, self.score_to_grid_increase())
+    def update_score_board(self):
+        self.score_board.update_score(
+            self._score, self._level, self.score_to_grid_increase()
+        )
 
 
 class SignalColor(Enum):
@@ -275,6 +287,7 @@ class Signal:
     from_position: Vec2
     rail: Rail
     _signal_color: SignalColor = SignalColor.GREEN
+    entity_id: int = field(default=NO_ENTITY_ID, compare=False)
 
     def __repr__(self):
         return f"Signal(from position {self.from_position} on {self.rail}: {self.signal_color})"
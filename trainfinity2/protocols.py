@@ -11,3 +11,15 @@ class RailCollection(Protocol):
 
     def rails_at_position(self, position: Vec2) -> set["Rail"]:
         raise NotImplementedError
+
+
+class ScoreBoard(Protocol):
+    def update_score(self, score: int, level: int, score_to_next_level: int) -> None:
+        raise NotImplementedError
+
+
+class RouteUser(Protocol):
+    entity_id: int
+
+    def replan_route(self) -> None:
+        raise NotImplementedError
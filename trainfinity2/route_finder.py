@@ -1,13 +1,63 @@
 from collections import defaultdict
+from contextlib import contextmanager
 from dataclasses import dataclass
 from heapq import heappop, heappush
-from typing import Callable
+from time import perf_counter
+from typing import Callable, Iterable, Iterator
 
 from pyglet.math import Vec2
 
 from .model import Rail, Station
 
 
+@dataclass(slots=True)
+class RouteFinderStats:
+    """Counters for the work done by the route finder. Only updated while collected
+    with collect_route_finder_stats(), so searches nobody is measuring only cost a
+    check of whether anyone is."""
+
+    calls: int = 0
+    nodes_popped: int = 0
+    edges_relaxed: int = 0
+    heap_pushes: int = 0
+    route_length: int = 0  # Summed over all routes found
+    cache_hits: int = 0
+    cache_misses: int = 0
+    wall_time: float = 0.0  # Seconds
+
+
+_collected_stats: list[RouteFinderStats] = []
+
+
+@contextmanager
+def collect_route_finder_stats(
+    stats: RouteFinderStats,
+) -> Iterator[RouteFinderStats]:
+    """Adds the work of all route searches inside the with block to `stats`.
+    Can be nested, for example to collect both per frame and per train."""
+    _collected_stats.append(stats)
+    try:
+        yield stats
+    finally:
+        _collected_stats.pop()
+
+
+def is_collecting_route_finder_stats() -> bool:
+    return bool(_collected_stats)
+
+
+def _record_stats(**counts: int | float):
+    for stats in _collected_stats:
+        for name, count in counts.items():
+            setattr(stats, name, getattr(stats, name) + count)
+
+
+def record_cache_hit(hit: bool):
+    """Called by route caches outside this module."""
+    if _collected_stats:
+        _record_stats(**{"cache_hits" if hit else "cache_misses": 1})
+
+
 @dataclass(frozen=True)
 class _RailVector:
     """Models a single rail and a direction of movement: the position to where the
@@ -31,53 +81,142 @@ def find_route(
 
     Returns an empty list if the train is already at the station.
     Returns None if no route can be found."""
+    station_and_route = find_route_to_closest_station(
+        possible_next_rails_method,
+        starting_rails,
+        initial_position,
+        [target_station],
+        previous_rail,
+    )
+    return station_and_route[1] if station_and_route else None
+
+
+def find_route_to_closest_station(
+    possible_next_rails_method: Callable[[Vec2, Rail | None], set[Rail]],
+    starting_rails: set[Rail],
+    initial_position: Vec2,
+    target_stations: Iterable[Station],
+    previous_rail: Rail | None = None,  # Assures the train can not just reverse
+) -> tuple[Station, list[Rail]] | None:
+    """Finds the closest of several stations and the shortest route to it.
+
+    A single search is made that stops at the first station reached, which is much
+    cheaper than calling find_route once per station.
+
+    Returns None if no route can be found to any of the stations."""
+    if not _collected_stats:
+        return _find_route_to_closest_station(
+            possible_next_rails_method,
+            starting_rails,
+            initial_position,
+            target_stations,
+            previous_rail,
+        )[0]
+
+    start_time = perf_counter()
+    (
+        station_and_route,
+        nodes_popped,
+        edges_relaxed,
+        heap_pushes,
+    ) = _find_route_to_closest_station(
+        possible_next_rails_method,
+        starting_rails,
+        initial_position,
+        target_stations,
+        previous_rail,
+    )
+    _record_stats(
+        calls=1,
+        nodes_popped=nodes_popped,
+        edges_relaxed=edges_relaxed,
+        heap_pushes=heap_pushes,
+        route_length=len(station_and_route[1]) if station_and_route else 0,
+        wall_time=perf_counter() - start_time,
+    )
+    return station_and_route
+
 
+def _find_route_to_closest_station(
+    possible_next_rails_method: Callable[[Vec2, Rail | None], set[Rail]],
+    starting_rails: set[Rail],
+    initial_position: Vec2,
+    target_stations: Iterable[Station],
+    previous_rail: Rail | None,
+) -> tuple[tuple[Station, list[Rail]] | None, int, int, int]:
+    """Returns the result of find_route_to_closest_station, and the number of nodes
+    popped, edges relaxed and heap pushes done to find it."""
+    nodes_popped = edges_relaxed = heap_pushes = 0
+
+    target_stations_from_end_position: dict[Vec2, list[Station]] = defaultdict(list)
+    for target_station in target_stations:
+        for position in {target_station.positions[0], target_station.positions[-1]}:
+            target_stations_from_end_position[position].append(target_station)
+    if not target_stations_from_end_position:
+        return None, nodes_popped, edges_relaxed, heap_pushes
+
+    initial_railvector = _RailVector(initial_position, previous_rail)
     distance_from_railvector: dict[_RailVector, int] = defaultdict(lambda: 999999999)
-    distance_from_railvector[_RailVector(initial_position, previous_rail)] = 0
-    railvectors_in_shortest_route: list[_RailVector] = []
+    distance_from_railvector[initial_railvector] = 0
+    previous_railvector_from_railvector: dict[_RailVector, _RailVector] = {}
     visited_railvectors: set[_RailVector] = set()
-    unvisited_railvectors: list[_RailVector] = [
-        _RailVector(initial_position, previous_rail)
-    ]
-    first_iteration = True
+    # The distance is included so that the closest rail vector is always popped first
+    unvisited_railvectors: list[tuple[int, _RailVector]] = [(0, initial_railvector)]
+    heap_pushes += 1
 
     while unvisited_railvectors:
-        current_railvector = heappop(unvisited_railvectors)
+        distance, current_railvector = heappop(unvisited_railvectors)
+        nodes_popped += 1
+        if current_railvector in visited_railvectors:
+            continue
         visited_railvectors.add(current_railvector)
 
-        if has_reached_end_of_target_station(
-            current_railvector.position, current_railvector.rail, target_station
+        for target_station in target_stations_from_end_position.get(
+            current_railvector.position, []
         ):
-            return _route(
-                current_railvector,
-                railvectors_in_shortest_route,
-                initial_position,
-                starting_rails,
-                target_station,
-            )
+            if has_reached_end_of_target_station(
+                current_railvector.position, current_railvector.rail, target_station
+            ):
+                if current_railvector == initial_railvector:
+                    route = []
+                else:
+                    route = _route(
+                        current_railvector,
+                        previous_railvector_from_railvector,
+                        initial_railvector,
+                        target_station,
+                    )
+                return (
+                    (target_station, route),
+                    nodes_popped,
+                    edges_relaxed,
+                    heap_pushes,
+                )
 
-        if first_iteration:
+        if current_railvector == initial_railvector:
             possible_next_rails = starting_rails
-            first_iteration = False
         else:
-            previous_rail = current_railvector.rail
             possible_next_rails = possible_next_rails_method(
-                current_railvector.position, previous_rail
+                current_railvector.position, current_railvector.rail
             )
         for rail in possible_next_rails:
             adjacent_railvector = _RailVector(
                 rail.other_end(*current_railvector.position), rail
             )
             if adjacent_railvector not in visited_railvectors:
-                adjacent_distance = distance_from_railvector[current_railvector] + 1
+                adjacent_distance = distance + 1
                 if distance_from_railvector[adjacent_railvector] > adjacent_distance:
+                    edges_relaxed += 1
                     distance_from_railvector[adjacent_railvector] = adjacent_distance
+                    previous_railvector_from_railvector[
+                        adjacent_railvector
+                    ] = current_railvector
                     heappush(
                         unvisited_railvectors,
-                        adjacent_railvector,
+                        (adjacent_distance, adjacent_railvector),
                     )
-                    railvectors_in_shortest_route.append(adjacent_railvector)
-    return None
+                    heap_pushes += 1
+    return None, nodes_popped, edges_relaxed, heap_pushes
 
 
 def has_reached_end_of_target_station(
@@ -94,31 +233,127 @@ def has_reached_end_of_target_station(
 
 def _route(
     current_railvector: _RailVector,
-    railvectors_in_shortest_route: list[_RailVector],
-    initial_position: Vec2,
-    starting_rails: set[Rail],
+    previous_railvector_from_railvector: dict[_RailVector, _RailVector],
+    initial_railvector: _RailVector,
     target_station: Station,
 ):
     route: list[Rail] = []
-    while True:
+    while current_railvector != initial_railvector:
         rail = current_railvector.rail
         assert rail
         route.append(rail)
-        next_position = rail.other_end(*current_railvector.position)
-
-        if (
-            next_position == initial_position
-            and current_railvector.rail in starting_rails
-        ):
-            break
-
-        current_railvector = [
-            railvector
-            for railvector in railvectors_in_shortest_route
-            if railvector.position == next_position and railvector.rail != rail
-        ][0]
+        current_railvector = previous_railvector_from_railvector[current_railvector]
 
     # Make sure that the train always goes to the furthest end of the station
     if not (set(route) & set(target_station.internal_rail)):
         route = list(reversed(target_station.internal_rail)) + route
     return route[::-1]
+
+
+class DistancesToStation:
+    """How far it is to the furthest end of a station from every position and
+    incoming rail that leads there, found with a single search backwards from the
+    station. Trains can then pick the shortest route starting with any of the rails
+    they can take without a search of their own at every position they reach."""
+
+    def __init__(
+        self,
+        possible_next_rails_method: Callable[[Vec2, Rail | None], set[Rail]],
+        target_station: Station,
+    ):
+        self._possible_next_rails_method = possible_next_rails_method
+        if not _collected_stats:
+            self._distance_from_railvector = _find_distances_to_station(
+                possible_next_rails_method, target_station
+            )[0]
+            return
+
+        start_time = perf_counter()
+        (
+            self._distance_from_railvector,
+            nodes_popped,
+            edges_relaxed,
+            heap_pushes,
+        ) = _find_distances_to_station(possible_next_rails_method, target_station)
+        _record_stats(
+            calls=1,
+            nodes_popped=nodes_popped,
+            edges_relaxed=edges_relaxed,
+            heap_pushes=heap_pushes,
+            wall_time=perf_counter() - start_time,
+        )
+
+    def shortest_routes(
+        self, initial_position: Vec2, starting_rails: Iterable[Rail]
+    ) -> Iterator[list[Rail]]:
+        """Yields the shortest route starting with each of the rails, shortest first.
+        Rails that do not lead to the station are skipped."""
+        distances_and_rails = []
+        for rail in starting_rails:
+            railvector = _RailVector(rail.other_end(*initial_position), rail)
+            if railvector in self._distance_from_railvector:
+                distances_and_rails.append(
+                    (self._distance_from_railvector[railvector], rail)
+                )
+        distances_and_rails.sort(key=lambda distance_and_rail: distance_and_rail[0])
+        for _, rail in distances_and_rails:
+            yield self._route(initial_position, rail)
+
+    def _route(self, initial_position: Vec2, first_rail: Rail) -> list[Rail]:
+        """Follows the rails that get closer to the station, one step at a time."""
+        route = [first_rail]
+        railvector = _RailVector(first_rail.other_end(*initial_position), first_rail)
+        distance = self._distance_from_railvector[railvector]
+        while distance > 0:
+            distance -= 1
+            for rail in self._possible_next_rails_method(
+                railvector.position, railvector.rail
+            ):
+                next_railvector = _RailVector(
+                    rail.other_end(*railvector.position), rail
+                )
+                if self._distance_from_railvector.get(next_railvector) == distance:
+                    railvector = next_railvector
+                    route.append(rail)
+                    break
+        return route
+
+
+def _find_distances_to_station(
+    possible_next_rails_method: Callable[[Vec2, Rail | None], set[Rail]],
+    target_station: Station,
+) -> tuple[dict[_RailVector, int], int, int, int]:
+    """Returns the distance to the furthest end of the station from every rail
+    vector that leads there, and the number of nodes popped, edges relaxed and heap
+    pushes done to find them."""
+    nodes_popped = edges_relaxed = heap_pushes = 0
+
+    distance_from_railvector: dict[_RailVector, int] = {}
+    unvisited_railvectors: list[tuple[int, _RailVector]] = []
+    for position in {target_station.positions[0], target_station.positions[-1]}:
+        for rail in possible_next_rails_method(position, None):
+            if has_reached_end_of_target_station(position, rail, target_station):
+                railvector = _RailVector(position, rail)
+                distance_from_railvector[railvector] = 0
+                heappush(unvisited_railvectors, (0, railvector))
+                heap_pushes += 1
+
+    while unvisited_railvectors:
+        distance, current_railvector = heappop(unvisited_railvectors)
+        nodes_popped += 1
+        current_rail = current_railvector.rail
+        assert current_rail
+        previous_position = current_rail.other_end(*current_railvector.position)
+        # A train can take any rail except the one it came on, so the rails it can
+        # have come on before taking a rail are the rails it can take after it
+        for previous_rail in possible_next_rails_method(
+            previous_position, current_rail
+        ):
+            previous_railvector = _RailVector(previous_position, previous_rail)
+            # Every rail is one step, so the first distance found is the shortest
+            if previous_railvector not in distance_from_railvector:
+                edges_relaxed += 1
+                distance_from_railvector[previous_railvector] = distance + 1
+                heappush(unvisited_railvectors, (distance + 1, previous_railvector))
+                heap_pushes += 1
+    return distance_from_railvector, nodes_popped, edges_relaxed, heap_pushes
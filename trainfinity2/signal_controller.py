@@ -1,15 +1,25 @@
+import csv
+from array import array
 from collections import defaultdict
-from dataclasses import dataclass
-from typing import Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Sequence, TextIO
 
 from pyglet.math import Vec2
 
-from trainfinity2.events import Event
+from trainfinity2.events import CreateEvent, Event
 
-from .model import Signal, SignalColor
+from .model import Rail, Signal, SignalColor
 from .protocols import RailCollection
 
 
+@dataclass(frozen=True)
+class DeadlockEvent(Event):
+    """Reservers that are all waiting for each other to release positions."""
+
+    reserver_ids: tuple[int, ...]
+
+
 @dataclass
 class SignalBlock:
     """
@@ -30,7 +40,10 @@ class SignalBlock:
 
     positions: frozenset[Vec2]
     signals: frozenset[Signal]
-    reserved_by: int | None = False
+    block_id: int = -1  # Dense index into the arrays of SignalController
+    reserved_by: int | None = None
+    # How many positions in the block each reserver has reserved
+    reservation_count_from_reserver_id: dict[int, int] = field(default_factory=dict)
 
     # def __post_init__(self):
     #     count_from_rail_position = Counter(
@@ -46,127 +59,751 @@ class SignalBlock:
     def _color(self):
         return SignalColor.RED if self.reserved_by else SignalColor.GREEN
 
+    def add_reservation(self, reserver_id: int, count: int):
+        """Add (or with a negative count, remove) reserved positions of a reserver."""
+        new_count = self.reservation_count_from_reserver_id.get(reserver_id, 0) + count
+        if new_count > 0:
+            self.reservation_count_from_reserver_id[reserver_id] = new_count
+        else:
+            self.reservation_count_from_reserver_id.pop(reserver_id, None)
+        # The first reserver keeps the block until it leaves
+        self.reserved_by = next(iter(self.reservation_count_from_reserver_id), None)
+
     def update_signals(self) -> list[Event]:
-        return [signal.set_signal_color(self._color) for signal in self.signals]
+        """Returns events only for the signals that changed color."""
+        color = self._color
+        return [
+            signal.set_signal_color(color)
+            for signal in self.signals
+            if signal.signal_color != color
+        ]
 
 
-class SignalController:
-    def __init__(
+NO_SIGNAL_BLOCK = -1
+
+# Signal toggles affecting fewer positions than this are rebuilt right away, since
+# handing them to the worker thread would cost more than it saves
+MIN_POSITIONS_FOR_BACKGROUND_REBUILD = 2000
+
+
+class _BlockIdRaster:
+    """The signal block id of each position, stored in a flat array covering a
+    rectangle of positions that grows when needed. Positions without rail have
+    NO_SIGNAL_BLOCK."""
+
+    MARGIN = 16
+
+    def __init__(self):
+        self._left = 0
+        self._bottom = 0
+        self._width = 0
+        self._height = 0
+        self._block_ids = array("l")
+
+    def __getitem__(self, position: Vec2) -> int:
+        x = int(position.x) - self._left
+        y = int(position.y) - self._bottom
+        if 0 <= x < self._width and 0 <= y < self._height:
+            return self._block_ids[y * self._width + x]
+        return NO_SIGNAL_BLOCK
+
+    def __setitem__(self, position: Vec2, block_id: int):
+        x = int(position.x) - self._left
+        y = int(position.y) - self._bottom
+        if not (0 <= x < self._width and 0 <= y < self._height):
+            self._grow_to_include(int(position.x), int(position.y))
+            x = int(position.x) - self._left
+            y = int(position.y) - self._bottom
+        self._block_ids[y * self._width + x] = block_id
+
+    def _grow_to_include(self, x: int, y: int):
+        if self._width:
+            left = min(self._left, x - self.MARGIN)
+            bottom = min(self._bottom, y - self.MARGIN)
+            right = max(self._left + self._width, x + self.MARGIN)
+            top = max(self._bottom + self._height, y + self.MARGIN)
+        else:
+            left, bottom = x - self.MARGIN, y - self.MARGIN
+            right, top = x + self.MARGIN, y + self.MARGIN
+        width = right - left
+        block_ids = array("l", [NO_SIGNAL_BLOCK]) * (width * (top - bottom))
+        for row in range(self._height):
+            start = (self._bottom + row - bottom) * width + self._left - left
+            block_ids[start : start + self._width] = self._block_ids[
+                row * self._width : (row + 1) * self._width
+            ]
+        self._left, self._bottom = left, bottom
+        self._width, self._height = width, top - bottom
+        self._block_ids = block_ids
+
+
+@dataclass(frozen=True)
+class BlockOccupancy:
+    """How much a signal block has been used, and how much other trains have had
+    to wait for it. Times are in seconds of game time."""
+
+    block_id: int
+    positions: frozenset[Vec2]
+    reserved_time: float
+    reservation_count: int
+    refusal_count: int  # Trains that had to stop because the block was reserved
+    total_wait: float
+    mean_wait: float
+
+
+class _BlockOccupancyArrays:
+    """The occupancy statistics of all signal blocks, stored in arrays indexed by
+    block id, so that updating them when reservations change is cheap."""
+
+    NOT_RESERVED = -1.0
+
+    def __init__(self):
+        self.reserved_time = array("d")
+        self.reserved_since = array("d")
+        self.reservation_count = array("l")
+        self.refusal_count = array("l")
+        self.wait_time = array("d")
+        self.wait_count = array("l")
+
+    def reset(self, block_id: int):
+        """Called when a block id is taken into use, also when it is reused."""
+        if block_id == len(self.reserved_time):
+            for statistics in (self.reserved_time, self.wait_time):
+                statistics.append(0.0)
+            for counts in (self.reservation_count, self.refusal_count, self.wait_count):
+                counts.append(0)
+            self.reserved_since.append(self.NOT_RESERVED)
+        else:
+            self.reserved_time[block_id] = self.wait_time[block_id] = 0.0
+            self.reservation_count[block_id] = self.refusal_count[block_id] = 0
+            self.wait_count[block_id] = 0
+            self.reserved_since[block_id] = self.NOT_RESERVED
+
+    def on_reserver_changed(
         self,
+        block_id: int,
+        previous_reserver_id: int | None,
+        reserver_id: int | None,
+        time: float,
     ):
+        if reserver_id == previous_reserver_id:
+            return
+        if reserver_id is not None:
+            self.reservation_count[block_id] += 1
+        if previous_reserver_id is None:
+            self.reserved_since[block_id] = time
+        elif reserver_id is None:
+            self.reserved_time[block_id] += time - self.reserved_since[block_id]
+            self.reserved_since[block_id] = self.NOT_RESERVED
+
+    def occupancy(self, signal_block: SignalBlock, time: float) -> BlockOccupancy:
+        block_id = signal_block.block_id
+        reserved_time = self.reserved_time[block_id]
+        if self.reserved_since[block_id] != self.NOT_RESERVED:
+            reserved_time += time - self.reserved_since[block_id]
+        wait_count = self.wait_count[block_id]
+        return BlockOccupancy(
+            block_id=block_id,
+            positions=signal_block.positions,
+            reserved_time=reserved_time,
+            reservation_count=self.reservation_count[block_id],
+            refusal_count=self.refusal_count[block_id],
+            total_wait=self.wait_time[block_id],
+            mean_wait=self.wait_time[block_id] / wait_count if wait_count else 0.0,
+        )
+
+
+def _crossing_rail(rail: Rail) -> Rail | None:
+    """The diagonal rail that crosses a diagonal rail in the middle, forming an X."""
+    if rail.x1 != rail.x2 and rail.y1 != rail.y2:
+        return Rail(rail.x1, rail.y2, rail.x2, rail.y1)
+    return None
+
+
+class SignalController:
+    """Keeps track of the signal blocks and which trains have reserved them.
+
+    In the default block-based mode, a train reserving any position in a signal block
+    reserves the whole block. In path-based mode, trains only reserve the positions
+    and rails of their path through a block, and other trains may enter the block as
+    long as their paths do not intersect. Signals are red in both modes if anything
+    in the block is reserved. The mode is chosen when the controller is created,
+    since the reservations of the two modes are kept differently."""
+
+    def __init__(self, path_based: bool = False):
         super().__init__()
-        # self._signal_blocks: list[SignalBlock] = []
-        self._signal_block_from_position: dict[Vec2, SignalBlock] = {}
-        self._signals: list[Signal] = []
-        self._reserved_positions_from_reserver_id: dict[int, set[Vec2]] = defaultdict(
-            set
+        self._path_based = path_based
+        # Signal blocks are numbered with dense ids, reused when blocks are removed,
+        # so that reservation lookups are plain array indexing.
+        self._signal_block_from_id: list[SignalBlock | None] = []
+        self._reserver_from_block_id: list[int | None] = []
+        self._free_block_ids: list[int] = []
+        self._block_id_raster = _BlockIdRaster()
+        self._signals_from_rail: dict[Rail, set[Signal]] = defaultdict(set)
+        self._reserved_positions_from_reserver_id: dict[int, set[Vec2]] = {}
+        # Only used in path-based mode. Dicts with None values are used as ordered
+        # sets, so that the first reserver keeps the position until it leaves.
+        self._reserver_ids_from_position: dict[Vec2, dict[int, None]] = defaultdict(
+            dict
         )
+        self._reserved_rails_from_reserver_id: dict[int, set[Rail]] = {}
+        self._reserver_ids_from_rail: dict[Rail, dict[int, None]] = defaultdict(dict)
+        # Wait-for graph: the reservers each waiting reserver is blocked by
+        self._blocking_reserver_ids_from_reserver_id: dict[int, set[int]] = {}
+        self._reported_deadlocks: set[frozenset[int]] = set()
+        # Wait queues: the wake-up callbacks of the reservers waiting for each
+        # signal block, so that waiting trains do not have to poll
+        self._wake_up_from_reserver_id_from_block_id: dict[
+            int, dict[int, Callable[[], None]]
+        ] = defaultdict(dict)
+        self._block_ids_from_waiting_reserver_id: dict[int, set[int]] = {}
+        # A rebuild of signal blocks running on a worker thread: the new blocks, and
+        # the blocks they will replace once swapped in
+        self._signal_block_rebuild: tuple[
+            Future[list[SignalBlock]], list[SignalBlock]
+        ] | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        # Game time, for the occupancy statistics
+        self._time = 0.0
+        self._occupancy = _BlockOccupancyArrays()
+        self._wait_start_time_from_reserver_id: dict[int, float] = {}
+
+    @property
+    def path_based(self) -> bool:
+        return self._path_based
 
     def __repr__(self) -> str:
         return (
             f"SignalController({', '.join(repr(signal) for signal in self._signals)})"
         )
 
+    @property
+    def _signal_blocks(self) -> list[SignalBlock]:
+        return [
+            signal_block
+            for signal_block in self._signal_block_from_id
+            if signal_block is not None
+        ]
+
+    def _signal_block_at(self, position: Vec2) -> SignalBlock | None:
+        block_id = self._block_id_raster[position]
+        if block_id == NO_SIGNAL_BLOCK:
+            return None
+        return self._signal_block_from_id[block_id]
+
+    def _add_signal_block(self, signal_block: SignalBlock):
+        if self._free_block_ids:
+            signal_block.block_id = self._free_block_ids.pop()
+            self._signal_block_from_id[signal_block.block_id] = signal_block
+            self._reserver_from_block_id[signal_block.block_id] = None
+        else:
+            signal_block.block_id = len(self._signal_block_from_id)
+            self._signal_block_from_id.append(signal_block)
+            self._reserver_from_block_id.append(None)
+        self._occupancy.reset(signal_block.block_id)
+        for position in signal_block.positions:
+            self._block_id_raster[position] = signal_block.block_id
+
+    def _remove_signal_block(self, signal_block: SignalBlock):
+        for position in signal_block.positions:
+            self._block_id_raster[position] = NO_SIGNAL_BLOCK
+        self._signal_block_from_id[signal_block.block_id] = None
+        self._reserver_from_block_id[signal_block.block_id] = None
+        self._free_block_ids.append(signal_block.block_id)
+        # The block id is about to be reused, and the positions waited for might
+        # now be in another block
+        self._wake_up_waiting(signal_block.block_id)
+
+    def _add_reservation(self, signal_block: SignalBlock, reserver_id: int, count: int):
+        previous_reserver_id = signal_block.reserved_by
+        signal_block.add_reservation(reserver_id, count)
+        self._reserver_from_block_id[signal_block.block_id] = signal_block.reserved_by
+        self._occupancy.on_reserver_changed(
+            signal_block.block_id,
+            previous_reserver_id,
+            signal_block.reserved_by,
+            self._time,
+        )
+        # In path-based mode, any released position might be the one waited for
+        if count < 0 and (
+            self.path_based or signal_block.reserved_by != previous_reserver_id
+        ):
+            self._wake_up_waiting(signal_block.block_id)
+
+    @property
+    def _signals(self) -> list[Signal]:
+        return [
+            signal for signals in self._signals_from_rail.values() for signal in signals
+        ]
+
     def _create_signal_block(
         self,
-        available_positions: set[Vec2],
-        # TODO: consider just taking a dict here instead of a RailCollection,
-        # perhaps less confusing
-        rail_collection: RailCollection,
-        signals: list[Signal],
+        start_position: Vec2,
+        rails_at_position: Callable[[Vec2], Iterable[Rail]],
     ) -> SignalBlock:
-        """
-        1. Add a random available position P1 to the signal block
-        2. If there is no position in the signal block that has not been handled, finish
-        3. Get a random position in the signal block that has not been handled
-        4. For each of the neighboring rails
-          4.1. Skip if the rail already has been traversed or if it has signal
-          3.2. Else, add the position P2 to the signal block
-        4. Add P1 to the list of handled positions
-        5. Go to 2.
-        """
-        rails_with_signals = {signal.rail for signal in signals}
-        signal_block_positions: set[Vec2] = {list(available_positions)[0]}
-        traversed_positions: set[Vec2] = set()
-        # Remove this if turns out not needed
-        # traversed_rails: set[Rail] = set()
-        block_signals = set()
-        while signal_block_positions - traversed_positions:
-            position = list(signal_block_positions - traversed_positions)[0]
-            new_rails = rail_collection.rails_at_position(position)
-
-            block_signals |= {
-                signal
-                for signal in signals
-                if signal.rail in new_rails and signal.from_position != position
-            }
+        """Flood fill from a position, over all rails that do not have signals.
 
-            signal_block_positions.update(
-                {
-                    neighboring_position
-                    for new_rail in new_rails
-                    for neighboring_position in new_rail.positions
-                    if new_rail not in rails_with_signals
-                }
-            )
-            traversed_positions.add(position)
+        The signals of the block are the ones on the rails at the edge of the block,
+        facing into the block."""
+        signal_block_positions: set[Vec2] = {start_position}
+        positions_to_traverse = [start_position]
+        block_signals: set[Signal] = set()
+        while positions_to_traverse:
+            position = positions_to_traverse.pop()
+            for rail in rails_at_position(position):
+                if signals := self._signals_from_rail.get(rail):
+                    block_signals.update(
+                        signal for signal in signals if signal.from_position != position
+                    )
+                    continue
+                neighboring_position = rail.other_end(*position)
+                if neighboring_position not in signal_block_positions:
+                    signal_block_positions.add(neighboring_position)
+                    positions_to_traverse.append(neighboring_position)
         return SignalBlock(frozenset(signal_block_positions), frozenset(block_signals))
 
+    def _find_signal_blocks(
+        self,
+        positions: set[Vec2],
+        rails_at_position: Callable[[Vec2], Iterable[Rail]],
+    ) -> list[SignalBlock]:
+        """The signal blocks covering all positions that have rail. Does not change
+        the state of the controller, so it can be run on the worker thread."""
+        signal_blocks = []
+        available_positions = {
+            position for position in positions if rails_at_position(position)
+        }
+        while available_positions:
+            signal_block = self._create_signal_block(
+                available_positions.pop(), rails_at_position
+            )
+            signal_blocks.append(signal_block)
+            available_positions -= signal_block.positions
+        return signal_blocks
+
+    def _create_signal_blocks_at(
+        self, positions: set[Vec2], rail_collection: RailCollection
+    ) -> list[SignalBlock]:
+        """Create the signal blocks covering all positions that have rail."""
+        signal_blocks = self._find_signal_blocks(
+            positions, rail_collection.rails_at_position
+        )
+        for signal_block in signal_blocks:
+            self._add_signal_block(signal_block)
+        return signal_blocks
+
     def create_signal_blocks(
         self,
         rail_collection: RailCollection,
         signals: list[Signal],
     ) -> list[Event]:
-        """Recreate all the signal blocks. Needed if something has been updated that can affect them,
-        such as rail having been created or deleted.
+        """Recreate all the signal blocks from scratch.
+
+        Prefer update_signal_blocks() when only a few rails or signals have changed."""
+        self.finish_signal_block_rebuild()
+        # Before the blocks are reset, since the wait times are recorded per block
+        for block_id in list(self._wake_up_from_reserver_id_from_block_id):
+            self._wake_up_waiting(block_id)
+        self._signals_from_rail = defaultdict(set)
+        for signal in signals:
+            self._signals_from_rail[signal.rail].add(signal)
+        self._signal_block_from_id = []
+        self._reserver_from_block_id = []
+        self._free_block_ids = []
+        self._block_id_raster = _BlockIdRaster()
+        self._occupancy = _BlockOccupancyArrays()
+        self._create_signal_blocks_at(
+            {position for rail in rail_collection.rails for position in rail.positions},
+            rail_collection,
+        )
+        return self._update_signal_block_reservations()
+
+    def update_signal_blocks(
+        self,
+        rail_collection: RailCollection,
+        changed_positions: Iterable[Vec2],
+        added_signals: Iterable[Signal] = (),
+        removed_signals: Iterable[Signal] = (),
+        in_background: bool = False,
+    ) -> list[Event]:
+        """Recreate only the signal blocks affected by a change. Needed if something
+        has been updated that can affect them, such as rail having been created or
+        deleted, or signals having been toggled.
 
-        Signal blocks always include the signals bordering the block, so the blocks have an overlap
-        of one position to the next block.
+        `changed_positions` must include the positions of all rails created or
+        deleted, and of all rails with signals added or removed. The cost is
+        proportional to the size of the affected signal blocks, not of the network.
 
-        OPTIMIZATION OPPORTUNITY: Currently all signal blocks are recreated each time. It would be
-        enough if the signal blocks that are affected are recreated, such as the once in proximity
-        to the rail being deleted, for example."""
-        # This line is not used in this method, should it be in the constructor instead?
-        self._signals = list(signals)
+        With `in_background`, large rebuilds are made on a worker thread and the
+        current signal blocks are kept until swap_in_rebuilt_signal_blocks() is
+        called after the rebuild is done. Only use this when no rail has been created
+        or deleted, since every position with rail must have a signal block."""
+        events = self.finish_signal_block_rebuild()
+        for signal in removed_signals:
+            self._signals_from_rail[signal.rail].discard(signal)
+            if not self._signals_from_rail[signal.rail]:
+                del self._signals_from_rail[signal.rail]
+        for signal in added_signals:
+            self._signals_from_rail[signal.rail].add(signal)
+
+        positions = set(changed_positions)
+        affected_signal_blocks = {
+            signal_block.block_id: signal_block
+            for position in positions
+            if (signal_block := self._signal_block_at(position))
+        }
+        for signal_block in affected_signal_blocks.values():
+            positions.update(signal_block.positions)
 
-        self._signal_blocks: list[SignalBlock] = []
-        available_positions = set().union(
-            *[rail.positions for rail in rail_collection.rails]
+        if in_background and len(positions) >= MIN_POSITIONS_FOR_BACKGROUND_REBUILD:
+            # The worker gets a snapshot of the rails, since the rail collection is
+            # changed on the main thread
+            rails_from_position = {
+                position: rail_collection.rails_at_position(position)
+                for position in positions
+            }
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="signal-blocks"
+                )
+            self._signal_block_rebuild = (
+                self._executor.submit(
+                    self._find_signal_blocks,
+                    positions,
+                    lambda position: rails_from_position.get(position, set()),
+                ),
+                list(affected_signal_blocks.values()),
+            )
+            return events
+
+        for signal_block in affected_signal_blocks.values():
+            self._remove_signal_block(signal_block)
+        new_signal_blocks = self._create_signal_blocks_at(positions, rail_collection)
+        events.extend(self._reapply_reservations(new_signal_blocks))
+        return events
+
+    def swap_in_rebuilt_signal_blocks(self) -> list[Event]:
+        """Called at the start of every tick. Replaces the affected signal blocks if a
+        rebuild on the worker thread is done, so that trains never see a half-done
+        rebuild."""
+        if self._signal_block_rebuild and self._signal_block_rebuild[0].done():
+            return self.finish_signal_block_rebuild()
+        return []
+
+    def finish_signal_block_rebuild(self) -> list[Event]:
+        """Waits for any rebuild on the worker thread and swaps in its signal blocks."""
+        if self._signal_block_rebuild is None:
+            return []
+        future, old_signal_blocks = self._signal_block_rebuild
+        self._signal_block_rebuild = None
+        new_signal_blocks = future.result()
+        for signal_block in old_signal_blocks:
+            self._remove_signal_block(signal_block)
+        for signal_block in new_signal_blocks:
+            self._add_signal_block(signal_block)
+        return self._reapply_reservations(new_signal_blocks)
+
+    def _reapply_reservations(
+        self, new_signal_blocks: list[SignalBlock]
+    ) -> list[Event]:
+        new_block_ids = {signal_block.block_id for signal_block in new_signal_blocks}
+        for reserver_id, positions in self._reserved_positions_from_reserver_id.items():
+            for position in positions:
+                signal_block = self._signal_block_at(position)
+                if signal_block and signal_block.block_id in new_block_ids:
+                    self._add_reservation(signal_block, reserver_id, 1)
+        return self._update_signals(new_signal_blocks)
+
+    def reserver(self, position: Vec2) -> int | None:
+        if self.path_based:
+            return next(iter(self._reserver_ids_from_position.get(position, {})), None)
+        block_id = self._block_id_raster[position]
+        if block_id == NO_SIGNAL_BLOCK:
+            raise KeyError(f"No rail at {position}")
+        return self._reserver_from_block_id[block_id]
+
+    def path_through_block(
+        self, start_position: Vec2, route: Sequence[Rail]
+    ) -> tuple[list[Vec2], list[Rail]]:
+        """The positions and rails of a route from its start until it leaves the
+        signal block it enters with its first rail."""
+        positions: list[Vec2] = []
+        rails: list[Rail] = []
+        position = start_position
+        block_id = None
+        for rail in route:
+            position = rail.other_end(*position)
+            if block_id is None:
+                block_id = self._block_id_raster[position]
+            elif self._block_id_raster[position] != block_id:
+                break
+            positions.append(position)
+            rails.append(rail)
+        return positions, rails
+
+    def can_reserve(
+        self, reserver_id: int, positions: Iterable[Vec2], rails: Iterable[Rail] = ()
+    ) -> bool:
+        """Whether no other reserver has reserved any of the positions, or, in
+        path-based mode, a rail crossing any of the rails."""
+        if not all(
+            self.reserver(position) in {reserver_id, None} for position in positions
+        ):
+            return False
+        return not self.path_based or all(
+            set(self._reserver_ids_from_rail.get(crossing_rail, {})) <= {reserver_id}
+            for rail in rails
+            if (crossing_rail := _crossing_rail(rail))
         )
-        while available_positions:
-            signal_block = self._create_signal_block(
-                available_positions=available_positions,
-                rail_collection=rail_collection,
-                signals=signals,
+
+    def reserve(
+        self,
+        reserver_id: int,
+        positions: Iterable[Vec2],
+        rails: Iterable[Rail] = (),
+    ) -> list[Event]:
+        """Called by trains when they enter a new rail.
+
+        The rails are only used in path-based mode, to stop trains from colliding
+        on crossing diagonal rails.
+
+        Only the signal blocks of the positions that were reserved or released since
+        the last call are updated."""
+        old_positions = self._reserved_positions_from_reserver_id.get(
+            reserver_id, set()
+        )
+        new_positions = set(positions)
+        self._reserved_positions_from_reserver_id[reserver_id] = new_positions
+        self.stop_waiting_for_reservers(reserver_id)
+        if self.path_based:
+            self._update_path_reservations(
+                reserver_id, old_positions, new_positions, set(rails)
             )
-            self._signal_blocks.append(signal_block)
-            available_positions -= signal_block.positions
-        self._signal_block_from_position = {
-            position: signal_block
-            for signal_block in self._signal_blocks
-            for position in signal_block.positions
+
+        changed_signal_blocks: dict[int, SignalBlock] = {}
+        for position, count in [
+            *((position, -1) for position in old_positions - new_positions),
+            *((position, 1) for position in new_positions - old_positions),
+        ]:
+            if signal_block := self._signal_block_at(position):
+                self._add_reservation(signal_block, reserver_id, count)
+                changed_signal_blocks[signal_block.block_id] = signal_block
+        return self._update_signals(list(changed_signal_blocks.values()))
+
+    def wait_for(
+        self, reserver_id: int, blocking_reserver_ids: Iterable[int]
+    ) -> list[Event]:
+        """Called by trains that failed to reserve positions held by other reservers.
+
+        Returns a DeadlockEvent if this closes a cycle of reservers waiting for each
+        other. Each deadlock is only reported once, until one of them moves."""
+        self._blocking_reserver_ids_from_reserver_id[reserver_id] = set(
+            blocking_reserver_ids
+        ) - {reserver_id}
+        deadlocked_reserver_ids = self._find_deadlock(reserver_id)
+        if deadlocked_reserver_ids is None:
+            return []
+        deadlock = frozenset(deadlocked_reserver_ids)
+        if deadlock in self._reported_deadlocks:
+            return []
+        self._reported_deadlocks.add(deadlock)
+        return [DeadlockEvent(tuple(deadlocked_reserver_ids))]
+
+    def _find_deadlock(self, reserver_id: int) -> list[int] | None:
+        """A cycle in the wait-for graph through the reserver, if there is one."""
+        reserver_ids_to_visit = [(reserver_id, [reserver_id])]
+        visited_reserver_ids = {reserver_id}
+        while reserver_ids_to_visit:
+            current_reserver_id, path = reserver_ids_to_visit.pop()
+            for (
+                blocking_reserver_id
+            ) in self._blocking_reserver_ids_from_reserver_id.get(
+                current_reserver_id, ()
+            ):
+                if blocking_reserver_id == reserver_id:
+                    return path
+                if blocking_reserver_id not in visited_reserver_ids:
+                    visited_reserver_ids.add(blocking_reserver_id)
+                    reserver_ids_to_visit.append(
+                        (blocking_reserver_id, [*path, blocking_reserver_id])
+                    )
+        return None
+
+    def stop_waiting_for_reservers(self, reserver_id: int):
+        """Called by trains that are no longer blocked by other reservers, also when
+        they are not moving, so that their old wait does not look like part of a
+        deadlock. Reserving also stops the wait."""
+        if self._blocking_reserver_ids_from_reserver_id.pop(reserver_id, None):
+            self._reported_deadlocks = {
+                deadlock
+                for deadlock in self._reported_deadlocks
+                if reserver_id not in deadlock
+            }
+
+    def wake_up_when_released(
+        self,
+        reserver_id: int,
+        positions: Iterable[Vec2],
+        wake_up: Callable[[], None],
+    ):
+        """Called by trains that failed to reserve any of the positions. wake_up is
+        called once, as soon as the signal block of any of the positions changes
+        reserver or, in path-based mode, has any position released."""
+        self._leave_wait_queues(reserver_id)
+        block_ids = {self._block_id_raster[position] for position in positions} - {
+            NO_SIGNAL_BLOCK
         }
+        self._block_ids_from_waiting_reserver_id[reserver_id] = block_ids
+        self._wait_start_time_from_reserver_id[reserver_id] = self._time
+        for block_id in block_ids:
+            self._occupancy.refusal_count[block_id] += 1
+            self._wake_up_from_reserver_id_from_block_id[block_id][
+                reserver_id
+            ] = wake_up
 
-        return self._update_signal_block_reservations()
+    def stop_waiting_for_release(self, reserver_id: int):
+        """Called by trains that stop waiting for other reasons than being woken
+        up, so that they are not woken up later and their wait is recorded."""
+        self._leave_wait_queues(reserver_id)
 
-    def reserver(self, position: Vec2) -> int | None:
-        return self._signal_block_from_position[position].reserved_by
+    def _leave_wait_queues(self, reserver_id: int):
+        wait_start_time = self._wait_start_time_from_reserver_id.pop(
+            reserver_id, self._time
+        )
+        for block_id in self._block_ids_from_waiting_reserver_id.pop(reserver_id, ()):
+            self._occupancy.wait_time[block_id] += self._time - wait_start_time
+            self._occupancy.wait_count[block_id] += 1
+            wake_up_from_reserver_id = self._wake_up_from_reserver_id_from_block_id[
+                block_id
+            ]
+            del wake_up_from_reserver_id[reserver_id]
+            if not wake_up_from_reserver_id:
+                del self._wake_up_from_reserver_id_from_block_id[block_id]
 
-    def reserve(self, reserver_id: int, positions: Iterable[Vec2]) -> list[Event]:
-        """Called by trains when they enter a new rail, or when they are destroyed."""
-        self._reserved_positions_from_reserver_id[reserver_id] = set(positions)
-        return self._update_signal_block_reservations()
+    def _wake_up_waiting(self, block_id: int):
+        wake_up_from_reserver_id = self._wake_up_from_reserver_id_from_block_id.get(
+            block_id
+        )
+        if not wake_up_from_reserver_id:
+            return
+        for reserver_id, wake_up in list(wake_up_from_reserver_id.items()):
+            self._leave_wait_queues(reserver_id)
+            wake_up()
+
+    def advance_time(self, delta_time: float):
+        """Called every tick, to keep the time used for the occupancy statistics."""
+        self._time += delta_time
+
+    def block_occupancy_report(self) -> list[BlockOccupancy]:
+        """The occupancy of all signal blocks, the worst bottleneck first: the block
+        that trains have waited the longest for in total, or if there is no waiting,
+        the block that has been reserved the longest.
+
+        Statistics are kept for as long as a block is unchanged. Rebuilt blocks
+        start from zero."""
+        return sorted(
+            (
+                self._occupancy.occupancy(signal_block, self._time)
+                for signal_block in self._signal_blocks
+            ),
+            key=lambda occupancy: (occupancy.total_wait, occupancy.reserved_time),
+            reverse=True,
+        )
+
+    def write_block_occupancy_csv(self, file: TextIO):
+        """Writes the block occupancy report as CSV, one row per block. A block is
+        identified by its lowest position."""
+        writer = csv.writer(file)
+        writer.writerow(
+            [
+                "block_id",
+                "x",
+                "y",
+                "position_count",
+                "reserved_time",
+                "reservation_count",
+                "refusal_count",
+                "total_wait",
+                "mean_wait",
+            ]
+        )
+        for occupancy in self.block_occupancy_report():
+            position = min(occupancy.positions)
+            writer.writerow(
+                [
+                    occupancy.block_id,
+                    position.x,
+                    position.y,
+                    len(occupancy.positions),
+                    f"{occupancy.reserved_time:.3f}",
+                    occupancy.reservation_count,
+                    occupancy.refusal_count,
+                    f"{occupancy.total_wait:.3f}",
+                    f"{occupancy.mean_wait:.3f}",
+                ]
+            )
+
+    def _update_path_reservations(
+        self,
+        reserver_id: int,
+        old_positions: set[Vec2],
+        new_positions: set[Vec2],
+        new_rails: set[Rail],
+    ):
+        for position in old_positions - new_positions:
+            del self._reserver_ids_from_position[position][reserver_id]
+            if not self._reserver_ids_from_position[position]:
+                del self._reserver_ids_from_position[position]
+        for position in new_positions - old_positions:
+            self._reserver_ids_from_position[position][reserver_id] = None
+
+        old_rails = self._reserved_rails_from_reserver_id.get(reserver_id, set())
+        self._reserved_rails_from_reserver_id[reserver_id] = new_rails
+        for rail in old_rails - new_rails:
+            del self._reserver_ids_from_rail[rail][reserver_id]
+            if not self._reserver_ids_from_rail[rail]:
+                del self._reserver_ids_from_rail[rail]
+        for rail in new_rails - old_rails:
+            self._reserver_ids_from_rail[rail][reserver_id] = None
+
+    def release(self, reserver_id: int) -> list[Event]:
+        """Called by trains when they are destroyed."""
+        events = self.reserve(reserver_id, set())
+        self.stop_waiting_for_release(reserver_id)
+        del self._reserved_positions_from_reserver_id[reserver_id]
+        self._reserved_rails_from_reserver_id.pop(reserver_id, None)
+        return events
 
     def _update_signal_block_reservations(self) -> list[Event]:
+        """Recount the reservations of all signal blocks from scratch."""
         for signal_block in self._signal_blocks:
+            signal_block.reservation_count_from_reserver_id = {}
             signal_block.reserved_by = None
-            for id_, positions in self._reserved_positions_from_reserver_id.items():
-                if positions & signal_block.positions:
-                    signal_block.reserved_by = id_
+            self._reserver_from_block_id[signal_block.block_id] = None
+        for reserver_id, positions in self._reserved_positions_from_reserver_id.items():
+            for position in positions:
+                if block := self._signal_block_at(position):
+                    self._add_reservation(block, reserver_id, 1)
         return self._update_signals()
 
-    def _update_signals(self) -> list[Event]:
-        return sum(
-            (signal_block.update_signals() for signal_block in self._signal_blocks),
-            start=[],
-        )
+    def _update_signals(
+        self, signal_blocks: list[SignalBlock] | None = None
+    ) -> list[Event]:
+        if signal_blocks is None:
+            signal_blocks = self._signal_blocks
+        events = [
+            event
+            for signal_block in signal_blocks
+            for event in signal_block.update_signals()
+        ]
+        if self._signal_block_rebuild is None:
+            return events
+        # Until the rebuilt blocks are swapped in, the current blocks can still have
+        # signals that have been removed, and must not be drawn again
+        return [
+            event
+            for event in events
+            if isinstance(event, CreateEvent)
+            and isinstance(event.object, Signal)
+            and event.object in self._signals_from_rail.get(event.object.rail, ())
+        ]
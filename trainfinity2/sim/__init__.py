@@ -0,0 +1,3 @@
+from .simulation import LevelUpEvent, Simulation
+
+__all__ = ["LevelUpEvent", "Simulation"]
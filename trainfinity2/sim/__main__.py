@@ -0,0 +1,87 @@
+"""Runs a scenario without graphics and reports how fast the simulation runs, for
+example
+
+  python -m trainfinity2.sim --trains 100 --ticks 2000"""
+import argparse
+from time import perf_counter
+from typing import Sequence
+
+from pyglet.math import Vec2
+
+from ..constants import SIMULATION_TICKS_PER_SECOND
+from ..model import IronMine, Market, Rail, Station
+from ..terrain import Terrain
+from .simulation import Simulation
+
+# Rows of buildings, stations and the track back, which keep lines apart
+_ROWS_PER_LINE = 4
+_LINE_LENGTH = 8
+
+
+def create_scenario(simulation: Simulation, train_count: int):
+    """Parallel loops of track, each with a train carrying iron from a mine to a
+    market. Trains cannot reverse, so they go back along the other side of the
+    loop."""
+    grid = simulation.grid
+    east = _LINE_LENGTH - 1
+    for line in range(train_count):
+        buildings_y = line * _ROWS_PER_LINE
+        y = buildings_y + 1
+        grid.create_building(IronMine(Vec2(1, buildings_y)))
+        grid.create_building(Market(Vec2(east - 1, buildings_y)))
+        grid.create_rail(
+            {Rail(x, y, x + 1, y) for x in range(east)}
+            | {Rail(x, y + 1, x + 1, y + 1) for x in range(east)}
+            | {Rail(0, y, 0, y + 1), Rail(east, y, east, y + 1)}
+        )
+        mine_station = Station((Vec2(1, y), Vec2(2, y)))
+        market_station = Station((Vec2(east - 2, y), Vec2(east - 1, y)))
+        grid.create_station(mine_station)
+        grid.create_station(market_station)
+        simulation.create_train(mine_station, market_station)
+
+
+def main(args: Sequence[str] | None = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m trainfinity2.sim",
+        description="Runs a scenario without graphics and reports ticks per second.",
+    )
+    parser.add_argument("--trains", type=int, default=50)
+    parser.add_argument("--ticks", type=int, default=1000)
+    parser.add_argument(
+        "--event-driven",
+        action="store_true",
+        help="move the trains by events instead of every tick",
+    )
+    parser.add_argument(
+        "--path-based",
+        action="store_true",
+        help="let trains with disjoint paths share signal blocks",
+    )
+    parsed_args = parser.parse_args(args)
+
+    # A single water tile, or random terrain will be generated
+    simulation = Simulation(
+        Terrain(water=[Vec2(-1, -1)]), path_based=parsed_args.path_based
+    )
+    simulation.start()
+    create_scenario(simulation, parsed_args.trains)
+    if parsed_args.event_driven:
+        simulation.use_event_driven_movement()
+
+    tick_length = 1 / SIMULATION_TICKS_PER_SECOND
+    start_time = perf_counter()
+    for _ in range(parsed_args.ticks):
+        simulation.tick(tick_length)
+        simulation.update_positions()
+    elapsed_time = perf_counter() - start_time
+
+    print(
+        f"{parsed_args.ticks} ticks with {len(simulation.trains)} trains in "
+        f"{elapsed_time:.2f} s: {parsed_args.ticks / elapsed_time:.0f} ticks per second, "
+        f"money {simulation.player.money}"
+    )
+
+
+if __name__ == "__main__":
+    main()
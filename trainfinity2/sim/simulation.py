@@ -0,0 +1,170 @@
+from dataclasses import dataclass
+from typing import Callable, Sequence
+
+from ..cargo_values import CARGO_VALUES
+from ..collisions import find_colliding_trains
+from ..constants import SECONDS_BETWEEN_CARGO_CREATION
+from ..event_driven_movement import EventDrivenMovement
+from ..events import CreateEvent, DestroyEvent, Event
+from ..grid import Grid
+from ..model import CargoSoldEvent, Player, Station
+from ..protocols import ScoreBoard
+from ..signal_controller import DeadlockEvent, SignalController
+from ..terrain import Terrain
+from ..train import Train
+
+
+@dataclass(frozen=True)
+class LevelUpEvent(Event):
+    level: int
+
+
+class _NoScoreBoard:
+    def update_score(self, score: int, level: int, score_to_next_level: int):
+        pass
+
+
+class Simulation:
+    """The game world without graphics or input: the grid, the signals, the trains
+    and the money. It is advanced one tick at a time, and tells its observers what
+    happens through events, which is how the Game and the Drawer keep up with it."""
+
+    def __init__(
+        self,
+        terrain: Terrain,
+        score_board: ScoreBoard | None = None,
+        path_based: bool = False,
+    ):
+        # Called with the events of every change to the world
+        self.observers: list[Callable[[Sequence[Event]], None]] = []
+        self.trains: list[Train] = []
+        # Moves the trains by events instead of every tick, when set
+        self.event_driven_movement: EventDrivenMovement | None = None
+        # Trains outside the view are moved cell by cell by events instead of every
+        # tick, which is enough for reserving positions and loading cargo
+        self._off_screen_movement = EventDrivenMovement()
+        self._off_screen_train_ids: set[int] = set()
+        # Let one of the trains in a deadlock reverse out of it
+        self.resolve_deadlocks = True
+        self.cargo_counter = 0.0
+
+        self.signal_controller = SignalController(path_based)
+        self.grid = Grid(terrain, self.signal_controller)
+        self.player = Player(score_board or _NoScoreBoard(), self._level_up)
+
+    def start(self):
+        """Reaches the first level, which creates the first buildings. Not done in
+        __init__, so that observers can be added before."""
+        self.player.level_up()
+        self.player.update_score_board()
+
+    def _notify(self, events: Sequence[Event]):
+        if events:
+            for observer in self.observers:
+                observer(events)
+
+    def use_event_driven_movement(self):
+        self.event_driven_movement = EventDrivenMovement()
+        for train in self.trains:
+            self.set_off_screen(train, False)
+            self.event_driven_movement.add(train)
+
+    def try_create_cargo_in_all_buildings(self):
+        for building in self.grid.buildings.values():
+            self._notify(building.try_create_cargo())
+
+    def tick(self, tick_length: float):
+        """Advances the simulation by one tick."""
+        self.signal_controller.advance_time(tick_length)
+        self._notify(self.signal_controller.swap_in_rebuilt_signal_blocks())
+        self.cargo_counter += tick_length
+        while self.cargo_counter > SECONDS_BETWEEN_CARGO_CREATION:
+            self.try_create_cargo_in_all_buildings()
+            self.cargo_counter -= SECONDS_BETWEEN_CARGO_CREATION
+
+        if self.event_driven_movement is None:
+            for train in self.trains:
+                if train.entity_id not in self._off_screen_train_ids:
+                    self._handle_train_events(train.move(tick_length))
+            self._handle_train_events(self._off_screen_movement.advance(tick_length))
+            self._destroy_colliding_trains()
+        else:
+            self._handle_train_events(self.event_driven_movement.advance(tick_length))
+
+    def update_positions(self):
+        """Places trains moved by events where they are at the current time, and
+        destroys those that collide. Positions are only needed for drawing and
+        collisions, so this is done once per frame rather than every tick."""
+        if self.event_driven_movement is not None:
+            self.event_driven_movement.update_positions()
+            self._destroy_colliding_trains()
+
+    def is_off_screen(self, train: Train) -> bool:
+        return train.entity_id in self._off_screen_train_ids
+
+    def set_off_screen(self, train: Train, off_screen: bool):
+        if off_screen == self.is_off_screen(train):
+            return
+        if off_screen:
+            self._off_screen_train_ids.add(train.entity_id)
+            self._off_screen_movement.add(train)
+        else:
+            self._off_screen_train_ids.remove(train.entity_id)
+            self._off_screen_movement.remove(train)
+
+    def _handle_train_events(self, events: list[Event]):
+        for event in events:
+            match event:
+                case CargoSoldEvent(type, amount):
+                    self.player.money += CARGO_VALUES[type] * amount
+                case DeadlockEvent(reserver_ids):
+                    self._on_deadlock(reserver_ids)
+        self._notify(events)
+
+    def _destroy_colliding_trains(self):
+        destroyed_train_ids: set[int] = set()
+        # Trains off screen are only where they last reached a position, and are
+        # kept apart by the signals
+        trains = [
+            train
+            for train in self.trains
+            if train.entity_id not in self._off_screen_train_ids
+        ]
+        for train_pair in find_colliding_trains(trains):
+            for train in train_pair:
+                # A train can collide with several trains at once
+                if train.entity_id not in destroyed_train_ids:
+                    destroyed_train_ids.add(train.entity_id)
+                    self.destroy_train(train)
+
+    def _on_deadlock(self, reserver_ids: tuple[int, ...]):
+        if self.resolve_deadlocks:
+            for reserver_id in reserver_ids:
+                if isinstance(train := self.grid.entities.get(reserver_id), Train):
+                    train.back_off()
+                    break
+
+    def create_train(self, station1: Station, station2: Station) -> Train:
+        train = Train(
+            station1.positions[0],
+            station2.positions[0],
+            self.grid,
+            self.signal_controller,
+        )
+        self.trains.append(train)
+        if self.event_driven_movement is not None:
+            self.event_driven_movement.add(train)
+        self._notify([CreateEvent(train)])
+        return train
+
+    def destroy_train(self, train: Train):
+        events = train.destroy()
+        self.trains.remove(train)
+        if self.event_driven_movement is not None:
+            self.event_driven_movement.remove(train)
+        self.set_off_screen(train, False)
+        events.append(DestroyEvent(train))
+        self._notify(events)
+
+    def _level_up(self, level: int):
+        self._notify([*self.grid.level_up(level), LevelUpEvent(level)])
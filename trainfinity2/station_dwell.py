@@ -0,0 +1,79 @@
+from dataclasses import dataclass
+from typing import Iterable
+
+from .events import Event
+from .model import Building, CargoType
+from .wagon import Wagon
+
+SECONDS_PER_CARGO_TRANSFERRED = 1.0
+
+
+@dataclass(frozen=True, slots=True)
+class CargoTransfer:
+    building: Building
+    cargo_type: CargoType
+    # Positive when loading onto the train, negative when unloading from it
+    amount: int
+
+
+def plan_cargo_transfers(
+    wagons: Iterable[Wagon],
+    buildings: Iterable[Building],
+    desired_cargo: set[CargoType],
+) -> list[CargoTransfer]:
+    """Decides everything a train stopping next to the buildings loads and unloads.
+
+    All cargo the buildings accept is unloaded, before loading, so that cargo is
+    not loaded just to be unloaded again. Only cargo desired at the next station is
+    loaded, one of each cargo type per wagon."""
+    wagons = list(wagons)
+    # A building can be adjacent to several positions of the station
+    buildings = list({id(building): building for building in buildings}.values())
+    transfers: list[CargoTransfer] = []
+    unloaded_cargo: set[CargoType] = set()
+    for building in buildings:
+        for cargo_type in building.accepts - unloaded_cargo:
+            amount = sum(wagon.cargo_count[cargo_type] for wagon in wagons)
+            if amount:
+                transfers.append(CargoTransfer(building, cargo_type, -amount))
+                unloaded_cargo.add(cargo_type)
+    for cargo_type in desired_cargo - unloaded_cargo:
+        space = sum(not wagon.cargo_count[cargo_type] for wagon in wagons)
+        for building in buildings:
+            if cargo_type not in building.produces:
+                continue
+            amount = min(building.cargo_count[cargo_type], space)
+            if amount:
+                transfers.append(CargoTransfer(building, cargo_type, amount))
+                space -= amount
+    return transfers
+
+
+def apply_cargo_transfers(
+    wagons: Iterable[Wagon], transfers: Iterable[CargoTransfer]
+) -> list[Event]:
+    """Moves the cargo between the wagons and the buildings, with one event per
+    building and cargo type."""
+    wagons = list(wagons)
+    events: list[Event] = []
+    for transfer in transfers:
+        cargo_type = transfer.cargo_type
+        if transfer.amount < 0:
+            for wagon in wagons:
+                wagon.cargo_count[cargo_type] = 0
+            events.extend(transfer.building.add_cargo(cargo_type, -transfer.amount))
+        else:
+            amount = transfer.amount
+            for wagon in wagons:
+                if amount and not wagon.cargo_count[cargo_type]:
+                    wagon.cargo_count[cargo_type] = 1
+                    amount -= 1
+            events.append(transfer.building.remove_cargo(cargo_type, transfer.amount))
+    return events
+
+
+def dwell_time(transfers: Iterable[CargoTransfer]) -> float:
+    """Seconds the train stays at the station for the transfers."""
+    return SECONDS_PER_CARGO_TRANSFERRED * sum(
+        abs(transfer.amount) for transfer in transfers
+    )
@@ -1,19 +1,28 @@
-from collections import deque
+from contextlib import AbstractContextManager, nullcontext
 from dataclasses import dataclass, field
+from itertools import pairwise
 
 from math import pi
 import math
-from typing import Callable, Sequence
+from typing import Iterable, Iterator, Sequence
 from pyglet.math import Vec2
 
 from trainfinity2.events import Event
 
 
 from .grid import Grid
-from .model import Building, Rail, CargoType, Station
+from .model import Rail, Station
 from .wagon import Wagon
-from .route_finder import find_route, has_reached_end_of_target_station
+from .route_finder import (
+    RouteFinderStats,
+    collect_route_finder_stats,
+    find_route,
+    find_route_to_closest_station,
+    has_reached_end_of_target_station,
+    is_collecting_route_finder_stats,
+)
 from .signal_controller import SignalController
+from .station_dwell import apply_cargo_transfers, dwell_time, plan_cargo_transfers
 from typing import NamedTuple
 
 
@@ -26,6 +35,83 @@ class PointAndAngle(NamedTuple):
     angle: float
 
 
+def _angle(dx: float, dy: float) -> float:
+    """The angle of a wagon heading in the opposite direction of (dx, dy)."""
+    return -(math.atan2(dy, dx) * 360 / 2 / pi - 90)
+
+
+class _PathBehindHead:
+    """A line from a moving head through fixed points behind it, for placing points
+    at equal distances along it, such as the wagons behind a train.
+
+    The arc lengths and angles of the fixed part are only recalculated when the
+    points change, so placing the points when only the head has moved is a lookup
+    per point, without creating any Vec2."""
+
+    __slots__ = ("_xs", "_ys", "_arc_lengths", "_angles")
+
+    def __init__(self, points: Iterable[Vec2] = ()):
+        self.set_points(points)
+
+    def set_points(self, points: Iterable[Vec2]):
+        self._xs = [float(point.x) for point in points]
+        self._ys = [float(point.y) for point in points]
+        # Distance along the line from the first point to each point
+        self._arc_lengths = [0.0]
+        # Angle of the line from each point to the next
+        self._angles: list[float] = []
+        for x1, y1, x2, y2 in zip(self._xs, self._ys, self._xs[1:], self._ys[1:]):
+            self._arc_lengths.append(
+                self._arc_lengths[-1] + math.hypot(x2 - x1, y2 - y1)
+            )
+            self._angles.append(_angle(x2 - x1, y2 - y1))
+
+    def points_and_angles(
+        self, head_x: float, head_y: float, n: int, distance: float
+    ) -> Iterator[tuple[float, float, float]]:
+        """Yields the x, y and angle of n points with equal distance along the line.
+
+        A point exactly on a corner gets the angle of the part of the line towards
+        the head, the way a train on a cell faces the rail it is about to take.
+        Trains moved cell by cell stop exactly on the corners, so their wagons are
+        often there. If the line is not long enough for the number of points
+        requested, all remaining points will be at the end of the line."""
+        xs, ys, arc_lengths = self._xs, self._ys, self._arc_lengths
+        if not xs:
+            for _ in range(n):
+                yield head_x, head_y, 0.0
+            return
+        head_dx = xs[0] - head_x
+        head_dy = ys[0] - head_y
+        head_length = math.hypot(head_dx, head_dy)
+        last_index = len(xs) - 1
+        index = 0
+        for i in range(1, n + 1):
+            distance_from_head = i * distance
+            if distance_from_head <= head_length:
+                fraction = distance_from_head / head_length
+                yield (
+                    head_x + head_dx * fraction,
+                    head_y + head_dy * fraction,
+                    _angle(head_dx, head_dy),
+                )
+                continue
+            arc_length = distance_from_head - head_length
+            while index < last_index and arc_lengths[index + 1] < arc_length:
+                index += 1
+            if index == last_index:
+                yield xs[index], ys[index], 0.0
+                continue
+            fraction = (arc_length - arc_lengths[index]) / (
+                arc_lengths[index + 1] - arc_lengths[index]
+            )
+            yield (
+                xs[index] + (xs[index + 1] - xs[index]) * fraction,
+                ys[index] + (ys[index + 1] - ys[index]) * fraction,
+                self._angles[index],
+            )
+
+
 def _find_equidistant_points_and_angles_along_line(
     line_points: Sequence[Vec2], n: int, distance: float
 ) -> list[PointAndAngle]:
@@ -33,37 +119,16 @@ def _find_equidistant_points_and_angles_along_line(
 
     If the provided line is not long enough for the number of points requested, all
     remaining points returned will be at the end of the line."""
-
-    line_points = deque(line_points)
-    current_position = line_points.popleft()
-    equidistant_points_and_angles: list[PointAndAngle] = []
-    distance_left_to_next_equidistant_point = distance
-    while len(equidistant_points_and_angles) < n:
-        if not line_points:
-            equidistant_points_and_angles.append(PointAndAngle(current_position, 0.0))
-        else:
-            distance_to_next_line_point = current_position.distance(line_points[0])
-            if distance_to_next_line_point > distance_left_to_next_equidistant_point:
-                equidistant_point = current_position.lerp(
-                    line_points[0],
-                    distance_left_to_next_equidistant_point
-                    / distance_to_next_line_point,
-                )
-                angle = -(
-                    (equidistant_point - current_position).heading * 360 / 2 / pi - 90
-                )
-                equidistant_points_and_angles.append(
-                    PointAndAngle(equidistant_point, angle)
-                )
-                current_position = equidistant_point
-                distance_left_to_next_equidistant_point = distance
-            else:
-                current_position = line_points.popleft()
-                distance_left_to_next_equidistant_point -= distance_to_next_line_point
-    return equidistant_points_and_angles
+    head, *points = line_points
+    return [
+        PointAndAngle(Vec2(x, y), angle)
+        for x, y, angle in _PathBehindHead(points).points_and_angles(
+            head.x, head.y, n, distance
+        )
+    ]
 
 
-@dataclass
+@dataclass(slots=True)
 class Train:
     first_station_position: Vec2
     second_station_position: Vec2
@@ -71,172 +136,279 @@ class Train:
     signal_controller: SignalController
     x: float = field(init=False)
     y: float = field(init=False)
+    # Position at the previous simulation tick, for drawing between ticks
+    previous_x: float = field(init=False)
+    previous_y: float = field(init=False)
     target_x: float = field(init=False)
     target_y: float = field(init=False)
     current_rail: Rail | None = None
     wagons: list[Wagon] = field(init=False)
-    selected = False
+    selected: bool = False
     wait_timer: float = 0.0
     angle: float = 0
     speed: float = 0.0  # Cells per second
+    # Also the id the train reserves positions with
+    entity_id: int = field(init=False)
+    # Route searches made by this train since it was created, counted while the route
+    # searches of the game are
+    route_finder_stats: RouteFinderStats = field(init=False)
+    _target_station: Station = field(init=False, repr=False)
+    _rails_on_route: list[Rail] | None = field(init=False, repr=False)
+    _position_history: list[Vec2] = field(init=False, repr=False)
+    _path_behind: _PathBehindHead = field(init=False, repr=False)
+    _step_factor: float = field(init=False, repr=False)
+    _is_waiting_for_signal: bool = field(init=False, repr=False)
 
     MAX_SPEED = 4.0  # 60.0  # Cells per second
     ACCELERATION = 1.3  # Cells per second squared
+    COLLISION_DISTANCE = 0.25  # Cells
 
     def __post_init__(self):
-        super().__init__()
+        self.grid.entities.add(self)
         self.x = self.first_station_position.x
         self.y = self.first_station_position.y
+        self.previous_x = self.x
+        self.previous_y = self.y
         self.target_x = self.x
         self.target_y = self.y
         self._target_station = self.grid.station_from_position[
             self.first_station_position
         ]
-        self._rails_on_route: list[Rail] | None = []
-        self._previous_targets_y = []
+        self._rails_on_route = []
 
         # The position history needs to be approximately as long as the train,
         # since it is used for reserving positions. As long as one wagon is
-        # approximately as long as a block, this will do.
-        self._position_history: deque[Vec2] = deque(maxlen=1)
+        # approximately as long as a block, this will do. The most recent position
+        # is first. A list, since a deque is much larger for so few positions. It
+        # is kept at one position more than the number of wagons in
+        # _on_reached_target, so it grows with the train as it moves.
+        self._position_history = []
         self.wagons = []
-        # add_wagon also extends the position history
+        # The line the wagons are placed along, updated with the position history
+        self._path_behind = _PathBehindHead()
         self.add_wagon()
 
-        self._run_after_wait: Callable[[], list[Event]] | None = None
+        # How far the train moves along each axis per cell moved, 1/sqrt(2) along
+        # diagonal rails. Updated when the train enters a new rail.
+        self._step_factor = 1.0
+        # Set when the train is blocked at a signal, until the signal controller
+        # wakes it up
+        self._is_waiting_for_signal = False
+        self.route_finder_stats = RouteFinderStats()
 
     @property
     def rails_on_route(self):
         return self._rails_on_route
 
     def move(self, delta_time) -> list[Event]:
+        self.previous_x = self.x
+        self.previous_y = self.y
+        for wagon in self.wagons:
+            wagon.previous_x = wagon.x
+            wagon.previous_y = wagon.y
+
+        if self._is_waiting_for_signal:
+            return []
+
         if self.wait_timer > 0:
             self.wait_timer -= delta_time
             return []
 
-        if self._run_after_wait:
-            events = self._run_after_wait()
-            self._run_after_wait = None
-            return events
+        speed = self.speed
+        if speed < self.MAX_SPEED:
+            speed = self.speed = min(
+                speed + self.ACCELERATION * delta_time, self.MAX_SPEED
+            )
 
-        if self.speed < self.MAX_SPEED:
-            self.speed += self.ACCELERATION * delta_time
-            self.speed = min(self.speed, self.MAX_SPEED)
-
-        pixels_to_move = delta_time * self.speed
-        dx = 0.0
-        dy = 0.0
-        if self.x > self.target_x + pixels_to_move:
-            dx = -pixels_to_move
-        elif self.x < self.target_x - pixels_to_move:
-            dx = pixels_to_move
-        if self.y > self.target_y + pixels_to_move:
-            dy = -pixels_to_move
-        elif self.y < self.target_y - pixels_to_move:
-            dy = pixels_to_move
-
-        if approx_equal(self.angle % 90.0, 45.0):
-            dx /= math.sqrt(2)
-            dy /= math.sqrt(2)
-
-        self.x += dx
-        self.y += dy
-
-        wagon_positions_and_angles = _find_equidistant_points_and_angles_along_line(
-            [Vec2(self.x, self.y)] + list(self._position_history),
-            len(self.wagons),
-            1.0,
-        )
-        for wagon, (wagon_position, wagon_angle) in zip(
-            self.wagons, wagon_positions_and_angles
+        # Runs every frame for every moving train, so locals are used instead of
+        # repeated attribute lookups
+        pixels_to_move = delta_time * speed
+        step = pixels_to_move * self._step_factor
+        x, y = self.x, self.y
+        target_x, target_y = self.target_x, self.target_y
+        if x > target_x + pixels_to_move:
+            x -= step
+        elif x < target_x - pixels_to_move:
+            x += step
+        if y > target_y + pixels_to_move:
+            y -= step
+        elif y < target_y - pixels_to_move:
+            y += step
+        self.x, self.y = x, y
+
+        for wagon, (wagon_x, wagon_y, wagon_angle) in zip(
+            self.wagons,
+            self._path_behind.points_and_angles(x, y, len(self.wagons), 1.0),
         ):
-            wagon.x, wagon.y = wagon_position
+            wagon.x = wagon_x
+            wagon.y = wagon_y
             wagon.angle = wagon_angle
 
         if (
             abs(self.x - self.target_x) < pixels_to_move
             and abs(self.y - self.target_y) < pixels_to_move
         ):
-            return self._on_reached_target()
+            with self._collect_route_finder_stats():
+                return self._on_reached_target()
         return []
 
+    def on_movement_event(self) -> list[Event]:
+        """Event-driven counterpart of move, for when the train has reached its
+        target or its wait is over. The caller moves the train."""
+        if self._is_waiting_for_signal:
+            return []
+        with self._collect_route_finder_stats():
+            return self._on_reached_target()
+
+    def set_position(self, x: float, y: float):
+        """Moves the train to a position between its previous target and its target,
+        and its wagons after it."""
+        self.x = self.previous_x = x
+        self.y = self.previous_y = y
+        for wagon, (wagon_x, wagon_y, wagon_angle) in zip(
+            self.wagons,
+            self._path_behind.points_and_angles(x, y, len(self.wagons), 1.0),
+        ):
+            wagon.x = wagon.previous_x = wagon_x
+            wagon.y = wagon.previous_y = wagon_y
+            wagon.angle = wagon_angle
+
+    def _collect_route_finder_stats(self) -> AbstractContextManager:
+        if is_collecting_route_finder_stats():
+            return collect_route_finder_stats(self.route_finder_stats)
+        return nullcontext()
+
+    @property
+    def is_waiting_for_signal(self) -> bool:
+        return self._is_waiting_for_signal
+
     def is_close_enough_to_click(self, x, y):
         return self.x - 1 <= x <= self.x + 1 and self.y - 1 <= y <= self.y + 1
 
-    def destroy(self):
-        self.signal_controller.reserve(id(self), set())
-
-    def is_colliding_with(self, train):
-        return abs(self.x - train.x) < 0.25 and abs(self.y - train.y) < 0.25
+    def destroy(self) -> list[Event]:
+        self.grid.remove_route(self)
+        self.grid.entities.remove(self)
+        # Also stops waiting for release
+        return self.signal_controller.release(self.entity_id)
+
+    def replan_route(self):
+        """Called by the grid when rail on the planned route, or next to it, has
+        been removed or created. The train keeps going to the position it is
+        currently heading to, and plans the rest of the route from there."""
+        # The new rail might lead past the signal the train is waiting at
+        self._stop_waiting_for_signal()
+        if self.current_rail is None or self.current_rail not in self.grid.rails:
+            self._set_rails_on_route(None)
+            return
+        current_position = Vec2(self.target_x, self.target_y)
+        with self._collect_route_finder_stats():
+            route = find_route(
+                self.grid.possible_next_rails_ignore_red_lights,
+                self.grid.possible_next_rails_ignore_red_lights(
+                    current_position, self.current_rail
+                ),
+                current_position,
+                self._target_station,
+                previous_rail=self.current_rail,
+            )
+        self._set_rails_on_route(None if route is None else [self.current_rail, *route])
+
+    def _set_rails_on_route(self, rails: list[Rail] | None):
+        self._rails_on_route = rails
+        self.grid.set_route(self, rails)
+
+    def is_colliding_with(self, train: "Train") -> bool:
+        """Whether the trains came closer than COLLISION_DISTANCE along both axes at
+        the same time since the previous tick, assuming that they moved in straight
+        lines at constant speeds. Only comparing the current positions would let
+        fast trains pass through each other."""
+        # The part of the tick, from 0 to 1, during which the trains are close
+        start, end = 0.0, 1.0
+        for position, previous_position, other_position, other_previous_position in (
+            (self.x, self.previous_x, train.x, train.previous_x),
+            (self.y, self.previous_y, train.y, train.previous_y),
+        ):
+            distance = previous_position - other_previous_position
+            velocity = (position - previous_position) - (
+                other_position - other_previous_position
+            )
+            if velocity == 0:
+                if abs(distance) >= self.COLLISION_DISTANCE:
+                    return False
+                continue
+            time1 = (-self.COLLISION_DISTANCE - distance) / velocity
+            time2 = (self.COLLISION_DISTANCE - distance) / velocity
+            start = max(start, min(time1, time2))
+            end = min(end, max(time1, time2))
+        return start < end
 
     def _can_reserve_position(self, position: Vec2) -> bool:
-        return self.signal_controller.reserver(position) in {id(self), None}
+        return self.signal_controller.reserver(position) in {self.entity_id, None}
 
-    def _stop_at_station(self, current_station: Station) -> list[Event]:
-        # Check factories before mines, or a the iron will
-        # instantly be transported to the factory
+    def _wait_for_signal(self, current_position: Vec2) -> list[Event]:
+        """Stops until any of the positions the train could go to next is released,
+        and reports the trains that have reserved them."""
         self.speed = 0
-        # This needs to be updated if we ever get multiple stations in a route
-        desired_cargo = self.grid.accepted_cargo(self.next_station(current_station))
-        for building in self.grid.adjacent_buildings(current_station.positions):
-            for cargo_type in building.accepts:
-                if self._has_cargo(cargo_type):
-                    self.wait_timer = 1
-                    self._run_after_wait = self._create_unload_cargo_method(
-                        building, cargo_type
-                    )
-                    return []
-            for cargo_type in building.produces:
-                if (
-                    cargo_type in desired_cargo
-                    and building.cargo_count[cargo_type] > 0
-                    and self._has_space(cargo_type)
-                ):
-                    self.wait_timer = 1
-                    self._run_after_wait = self._create_load_cargo_method(cargo_type)
-                    return [building.remove_cargo(cargo_type, 1)]
-        self._target_station = self.next_station(current_station)
-        # This ensures that the train can immediately reverse at the station
-        # Otherwise it the train would prefer to continue forward and then reverse
-        # self.current_rail = None
-        return []
-
-    def _create_unload_cargo_method(
-        self, building: Building, cargo_type: CargoType
-    ) -> Callable[[], list[Event]]:
-        def inner() -> list[Event]:
-            events: list[Event] = []
-            for wagon in reversed(self.wagons):
-                if wagon.cargo_count[cargo_type]:
-                    events.extend(
-                        building.add_cargo(cargo_type, wagon.cargo_count[cargo_type])
-                    )
-                    wagon.cargo_count[cargo_type] = 0
-                    return events
-            return events
-
-        return inner
+        self._is_waiting_for_signal = True
+        next_positions = {
+            rail.other_end(*current_position)
+            for rail in self.grid.possible_next_rails_ignore_red_lights(
+                position=current_position, previous_rail=self.current_rail
+            )
+        }
+        self.signal_controller.wake_up_when_released(
+            self.entity_id, next_positions, self._wake_up
+        )
+        reserver_ids = {
+            self.signal_controller.reserver(position) for position in next_positions
+        }
+        return self.signal_controller.wait_for(
+            self.entity_id,
+            {
+                reserver_id
+                for reserver_id in reserver_ids
+                if reserver_id is not None and reserver_id != self.entity_id
+            },
+        )
 
-    def _has_space(self, cargo_type: CargoType):
-        return any(not wagon.cargo_count[cargo_type] for wagon in self.wagons)
+    def _wake_up(self):
+        self._is_waiting_for_signal = False
 
-    def _has_cargo(self, cargo_type: CargoType):
-        return any(wagon.cargo_count[cargo_type] for wagon in self.wagons)
+    def _stop_waiting_for_signal(self):
+        self.signal_controller.stop_waiting_for_release(self.entity_id)
+        self._wake_up()
 
-    def _create_load_cargo_method(self, cargo_type: CargoType):
-        def inner():
-            for wagon in self.wagons:
-                if not wagon.cargo_count[cargo_type]:
-                    wagon.cargo_count[cargo_type] = 1
-                    return []
-            return []
+    def back_off(self):
+        """Lets the train reverse from where it is, for example to get out of a
+        deadlock."""
+        self.current_rail = None
+        self._stop_waiting_for_signal()
 
-        return inner
+    def _stop_at_station(self, current_station: Station) -> list[Event]:
+        """Loads and unloads everything at once, and stays for as long as it takes
+        before heading for the next station."""
+        self.speed = 0
+        # This needs to be updated if we ever get multiple stations in a route
+        next_station = self.next_station(current_station)
+        transfers = plan_cargo_transfers(
+            self.wagons,
+            self.grid.buildings_at_station(current_station),
+            self.grid.accepted_cargo(next_station),
+        )
+        self.wait_timer = dwell_time(transfers)
+        self._target_station = next_station
+        return apply_cargo_transfers(self.wagons, transfers)
 
     def next_station(self, current_station: Station) -> Station:
+        # The train might have stopped at another platform than the one it was
+        # created at
+        at_first_station = any(
+            self.first_station_position in platform.positions
+            for platform in self.grid.platforms(current_station)
+        )
         return (
             self.grid.station_from_position[self.second_station_position]
-            if self.first_station_position in current_station.positions
+            if at_first_station
             else self.grid.station_from_position[self.first_station_position]
         )
 
@@ -252,9 +424,9 @@ class Train:
         }
 
         if not starting_rails:
-            self.speed = 0
-            self.wait_timer = 1
-            return []
+            return self._wait_for_signal(current_position)
+        # The train might still not move, for example if there is no route
+        self.signal_controller.stop_waiting_for_reservers(self.entity_id)
 
         if has_reached_end_of_target_station(
             current_position, self.current_rail, self._target_station
@@ -263,12 +435,9 @@ class Train:
             events.extend(self._reserve(current_position))
             return events
 
-        self._rails_on_route = find_route(
-            self.grid.possible_next_rails_ignore_red_lights,
-            starting_rails,
-            current_position,
-            self._target_station,
-            previous_rail=self.current_rail,
+        self._choose_platform(current_position, starting_rails)
+        self._set_rails_on_route(
+            self._cheapest_free_route(current_position, starting_rails)
         )
 
         # If there is no path to the target, wait
@@ -279,7 +448,9 @@ class Train:
 
         next_rail = self._rails_on_route[0]
         next_position = next_rail.other_end(*current_position)
-        self._position_history.appendleft(Vec2(self.target_x, self.target_y))
+        self._position_history.insert(0, Vec2(self.target_x, self.target_y))
+        del self._position_history[len(self.wagons) + 1 :]
+        self._path_behind.set_points(self._position_history)
 
         self._update_current_rail_and_target_xy(next_rail, self.target_x, self.target_y)
 
@@ -291,19 +462,89 @@ class Train:
         ):
             self.speed /= 2
 
-        return self._reserve(next_position)
+        return self._reserve(next_position, current_position, self._rails_on_route)
+
+    def _choose_platform(self, current_position: Vec2, starting_rails: set[Rail]):
+        """Heads for the closest free platform of the target station instead, if
+        another train has reserved the platform the train is heading for. Keeps the
+        platform if all of them are taken, and waits for it to be released."""
+        platforms = self.grid.platforms(self._target_station)
+        if len(platforms) == 1 or self._is_platform_free(self._target_station):
+            return
+        free_platforms = [
+            platform for platform in platforms if self._is_platform_free(platform)
+        ]
+        if not free_platforms:
+            return
+        station_and_route = find_route_to_closest_station(
+            self.grid.possible_next_rails_ignore_red_lights,
+            starting_rails,
+            current_position,
+            free_platforms,
+            previous_rail=self.current_rail,
+        )
+        if station_and_route:
+            self._target_station = station_and_route[0]
+
+    def _is_platform_free(self, platform: Station) -> bool:
+        return all(
+            self._can_reserve_position(position) for position in platform.positions
+        )
+
+    def _cheapest_free_route(
+        self, current_position: Vec2, starting_rails: set[Rail]
+    ) -> list[Rail] | None:
+        """Picks the shortest route that starts on a rail that can be reserved, so
+        that the train can go around a reserved block instead of waiting for it. The
+        routes come from the distances to the target station, which are only found
+        once per station rather than at every position."""
+        for route in self.grid.distances_to_station(
+            self._target_station
+        ).shortest_routes(current_position, starting_rails):
+            if self._can_reserve_route(current_position, route):
+                return route
+        return None
+
+    def _can_reserve_route(self, current_position: Vec2, route: list[Rail]) -> bool:
+        """In path-based signalling, whether the path through the next signal block
+        is free. In block-based signalling, checking the first position is enough."""
+        if not self.signal_controller.path_based:
+            return True
+        positions, rails = self.signal_controller.path_through_block(
+            current_position, route
+        )
+        return self.signal_controller.can_reserve(self.entity_id, positions, rails)
 
     def add_wagon(self):
         self.wagons.append(Wagon(self.x, self.y))
-        self._position_history = deque(
-            self._position_history, maxlen=len(self.wagons) + 1
-        )
+        self._path_behind.set_points(self._position_history)
         # TODO: wagons are now created on top of train
 
-    def _reserve(self, position: Vec2) -> list[Event]:
-        return self.signal_controller.reserve(
-            id(self), [*self._position_history, position]
-        )
+    def _reserve(
+        self,
+        position: Vec2,
+        route_start_position: Vec2 | None = None,
+        route: Sequence[Rail] = (),
+    ) -> list[Event]:
+        """Reserve the positions the train and its wagons occupy. In path-based
+        signalling, also the path ahead through the next signal block, and the
+        rails of all of it."""
+        positions = [position, *self._position_history]
+        if not self.signal_controller.path_based:
+            return self.signal_controller.reserve(self.entity_id, positions)
+
+        rails = [
+            Rail(*position1, *position2)
+            for position1, position2 in pairwise(positions)
+            if position1 != position2
+        ]
+        if route_start_position is not None:
+            path_positions, path_rails = self.signal_controller.path_through_block(
+                route_start_position, route
+            )
+            positions.extend(path_positions)
+            rails.extend(path_rails)
+        return self.signal_controller.reserve(self.entity_id, positions, rails)
 
     def _is_sharp_corner(self, middle: Vec2, point1: Vec2, point2: Vec2):
         angle = math.atan2(point2.y - middle.y, point2.x - middle.x) - math.atan2(
@@ -326,3 +567,6 @@ class Train:
         dy = self.target_y - self.y
         angle = Vec2(dx, dy).heading * 360 / 2 / pi - 90
         self.angle = -round(angle / 45.0) * 45.0
+        self._step_factor = (
+            1 / math.sqrt(2) if approx_equal(self.angle % 90.0, 45.0) else 1.0
+        )
@@ -1,15 +1,40 @@
-from collections import defaultdict
+from array import array
 from dataclasses import dataclass, field
+from typing import Iterator
 
 from trainfinity2.model import CargoType
 
 
-@dataclass
+class CargoCount:
+    """The amount of each cargo type, in an array indexed by cargo id instead of a
+    dict, to keep wagons small."""
+
+    __slots__ = ("_counts",)
+
+    def __init__(self):
+        self._counts = array("l", [0]) * len(CargoType)
+
+    def __getitem__(self, cargo_type: CargoType) -> int:
+        return self._counts[cargo_type.id]
+
+    def __setitem__(self, cargo_type: CargoType, count: int):
+        self._counts[cargo_type.id] = count
+
+    def __iter__(self) -> Iterator[CargoType]:
+        return iter(CargoType)
+
+
+@dataclass(slots=True)
 class Wagon:
     x: float
     y: float
-    cargo_count: dict[CargoType, int] = field(init=False)
+    cargo_count: CargoCount = field(init=False)
     angle: float = 0
+    # Position at the previous simulation tick, for drawing between ticks
+    previous_x: float = field(init=False)
+    previous_y: float = field(init=False)
 
     def __post_init__(self):
-        self.cargo_count = defaultdict(int)
+        self.cargo_count = CargoCount()
+        self.previous_x = self.x
+        self.previous_y = self.y